@@ -5,16 +5,34 @@ from flask import (
 from datetime import datetime, timedelta
 import random
 import unicodedata
-import io
 import base64
+import atexit
+import os
+import threading
+import time
 from pathlib import Path
 
 from werkzeug.security import check_password_hash, generate_password_hash
 
 from backend.config import Config
-from backend.db import query_one, query_all, execute
+from backend.db import (
+    query_one, query_all, execute, pool_stats, transaction,
+    begin_request, end_request, query_stats,
+)
 from backend.routes_admin import admin_bp
-from frontend.ai.plate_recognition import read_plate_from_image
+from frontend.ai.ocr_pool import OCRPool, OCRPoolBusy
+from frontend.ai.ocr_cache import PlateResultCache, frame_digest
+from frontend.ai.ocr_telemetry import VariantTelemetry
+from frontend.ai.plate_voting import PlateVoter
+from frontend.ai.image_utils import FACE_MAX_SIDE, load_image_rgb
+from frontend.ai.motion_gate import MotionGate
+from frontend.ai.plate_index import PlateIndex
+from frontend.ai.plate_recognition import _normalize_raw_text
+from frontend.ai.face_cache import ReferenceEncodingCache
+from frontend.ai.face_detect import FACE_OK, encode_single_face
+from frontend.ai.face_session import (
+    FaceVerifySessions, FACE_BUSY, FACE_PENDING, FACE_PROCESS, FACE_REJECTED, FACE_VERIFIED,
+)
 
 
 app = Flask(
@@ -34,6 +52,65 @@ GATE_UPLOAD_DIR = Path(app.static_folder) / "uploads" / "gate"
 # đăng ký backend API
 app.register_blueprint(admin_bp)
 
+
+# Đo số câu lệnh DB theo request (chỉ khi DB_INSTRUMENT=1) -> header X-DB-Queries / X-DB-Time-Ms
+@app.before_request
+def _db_begin_request():
+    begin_request(request.endpoint)
+
+
+@app.after_request
+def _db_end_request(response):
+    info = end_request()
+    if info is not None:
+        response.headers["X-DB-Queries"] = str(info["count"])
+        response.headers["X-DB-Time-Ms"] = str(info["ms"])
+    return response
+
+
+@app.teardown_request
+def _db_teardown_request(exc):
+    # request lỗi không qua after_request -> vẫn phải xoá trạng thái của luồng
+    end_request()
+
+# ==== OCR biển số: pool tiến trình ====
+# Thống kê biến thể tiền xử lý theo làn -> thử biến thể hay thắng trước, bỏ biến thể vô dụng
+ocr_variant_stats = VariantTelemetry(
+    min_samples=Config.OCR_VARIANT_MIN_SAMPLES,
+    skip_below=Config.OCR_VARIANT_SKIP_BELOW,
+) if Config.OCR_ADAPTIVE_VARIANTS else None
+
+ocr_pool = OCRPool(
+    size=Config.OCR_POOL_SIZE,
+    queue_size=Config.OCR_QUEUE_SIZE,
+    timeout=Config.OCR_JOB_TIMEOUT,
+    threads_per_worker=Config.OCR_THREADS_PER_WORKER,
+    telemetry=ocr_variant_stats,
+    fastpath_min_conf=Config.PLATE_FASTPATH_MIN_CONF,
+    fastpath_vote_conf=Config.PLATE_FASTPATH_VOTE_CONF,
+)
+atexit.register(ocr_pool.shutdown)
+
+# Cache kết quả OCR: kiosk gửi frame mỗi 1.2s, frame giống hệt (cùng kiosk) không OCR lại
+plate_cache = PlateResultCache(
+    max_size=Config.OCR_CACHE_SIZE,
+    ttl=Config.OCR_CACHE_TTL,
+    negative_ttl=Config.OCR_CACHE_NEGATIVE_TTL,
+)
+
+# Bỏ phiếu biển số qua nhiều frame cho mỗi kiosk
+plate_voter = PlateVoter(
+    window_seconds=Config.PLATE_VOTE_WINDOW,
+    commit_score=Config.PLATE_VOTE_COMMIT_SCORE,
+    strong_conf=Config.PLATE_VOTE_STRONG_CONF,
+)
+
+# Bỏ qua OCR khi cảnh trước camera không đổi (làn trống)
+motion_gate = MotionGate(
+    threshold=Config.MOTION_THRESHOLD,
+    max_skip_seconds=Config.MOTION_MAX_SKIP_SECONDS,
+) if Config.MOTION_GATE_ENABLED else None
+
 # ==== Face Recognition ====
 try:
     import face_recognition
@@ -42,6 +119,125 @@ except ImportError as e:
     print("[WARN] face_recognition not available:", e)
 
 
+def _encode_reference_face(path):
+    """Encoding khuôn mặt trong ảnh tham chiếu (None nếu không thấy mặt hoặc có nhiều mặt lớn)."""
+    img, _ = load_image_rgb(path, FACE_MAX_SIDE)
+    # cùng quy tắc với add_resident_face: người nhỏ phía sau bị bỏ qua, 2 mặt lớn -> từ chối
+    enc, status = encode_single_face(img)
+    if status != FACE_OK:
+        print(f"[WARN] Ảnh tham chiếu {path} không dùng được: {status}")
+    return enc
+
+
+# encoding ảnh tham chiếu của cư dân: tính 1 lần, tự tính lại khi đổi ảnh / mtime
+face_ref_cache = ReferenceEncodingCache(_encode_reference_face, max_size=Config.FACE_REF_CACHE_SIZE)
+
+# trạng thái xác thực khuôn mặt theo lượt xe ra (resident_id, biển số)
+face_sessions = FaceVerifySessions(
+    threshold=Config.FACE_VERIFY_THRESHOLD,
+    max_frames=Config.FACE_VERIFY_MAX_FRAMES,
+    reject_mean=Config.FACE_VERIFY_REJECT_MEAN,
+    ttl=Config.FACE_SESSION_TTL,
+)
+
+
+# =========================================================
+#  WARM-UP MODEL (OCR + FACE) & READINESS
+# =========================================================
+# pending -> loading -> ready | error ; unavailable = thư viện không cài
+MODEL_STATUS = {
+    "ocr": "pending",
+    "face": "pending" if face_recognition else "unavailable",
+}
+_warmup_running = False
+_warmup_finished_at = None  # time.monotonic() lần warm-up gần nhất kết thúc
+_warmup_lock = threading.Lock()
+
+
+def _warmup_models():
+    global _warmup_running, _warmup_finished_at
+    try:
+        _warmup_once()
+    finally:
+        with _warmup_lock:
+            _warmup_running = False
+            _warmup_finished_at = time.monotonic()
+
+
+def _warmup_once():
+    # chỉ warm lại model chưa ready (lần retry sau lỗi)
+    if MODEL_STATUS["ocr"] != "ready":
+        MODEL_STATUS["ocr"] = "loading"
+        try:
+            MODEL_STATUS["ocr"] = "ready" if ocr_pool.warmup() else "error"
+        except Exception as e:
+            print("[WARN] warm-up OCR failed:", e)
+            MODEL_STATUS["ocr"] = "error"
+
+    if face_recognition is not None and MODEL_STATUS["face"] != "ready":
+        MODEL_STATUS["face"] = "loading"
+        try:
+            import numpy as np
+            # ảnh trống + khai báo sẵn vị trí mặt = cả ảnh: detector không thấy mặt sẽ bỏ qua
+            # encoder, nên truyền known_face_locations để model 128-d thật sự được load + chạy
+            blank = np.zeros((120, 120, 3), dtype=np.uint8)
+            face_recognition.face_encodings(blank, known_face_locations=[(0, 120, 120, 0)])
+            MODEL_STATUS["face"] = "ready"
+        except Exception as e:
+            print("[WARN] warm-up face failed:", e)
+            MODEL_STATUS["face"] = "error"
+
+    print("[INFO] warm-up xong:", MODEL_STATUS)
+
+
+def start_model_warmup():
+    """
+    Chạy warm-up trong thread nền: lần đầu, và chạy lại khi có model "error"
+    (cách lần trước >= MODEL_WARMUP_RETRY_SECONDS). Đang chạy thì bỏ qua.
+    """
+    global _warmup_running
+    with _warmup_lock:
+        if _warmup_running:
+            return
+        if _warmup_finished_at is not None:
+            if "error" not in MODEL_STATUS.values():
+                return
+            if time.monotonic() - _warmup_finished_at < Config.MODEL_WARMUP_RETRY_SECONDS:
+                return
+        _warmup_running = True
+    threading.Thread(target=_warmup_models, name="model-warmup", daemon=True).start()
+
+
+def models_ready() -> bool:
+    # pool đã đọc được biển số (phục hồi sau warm-up lỗi) -> OCR coi như ready
+    if MODEL_STATUS["ocr"] == "error" and ocr_pool.ready:
+        MODEL_STATUS["ocr"] = "ready"
+    return all(v in ("ready", "unavailable") for v in MODEL_STATUS.values())
+
+
+# `python app.py` (debug) chạy 2 tiến trình: bỏ qua tiến trình cha của reloader
+_is_reloader_parent = __name__ == "__main__" and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+# start method "spawn" (Windows): mỗi worker OCR import lại app.py dưới tên __mp_main__
+# -> không warm-up (thread + OCRPool lồng nhau) và không chạy DDL trong worker
+_is_spawn_child = __name__ == "__mp_main__"
+if Config.MODEL_WARMUP and not _is_reloader_parent and not _is_spawn_child:
+    start_model_warmup()
+
+
+@app.route("/healthz/ready")
+def healthz_ready():
+    """Load balancer chỉ gửi traffic kiosk khi model đã warm (200), ngược lại 503."""
+    if Config.MODEL_WARMUP:
+        start_model_warmup()
+
+    ready = models_ready()
+    return jsonify({
+        "ready": ready,
+        "models": MODEL_STATUS,
+        "ocr_pool": ocr_pool.stats(),
+    }), (200 if ready else 503)
+
+
 # =========================================================
 #  BIẾN DÙNG CHUNG CHO TEMPLATE (navbar: role, brand_url)
 # =========================================================
@@ -142,7 +338,8 @@ def ensure_support_tables():
         print("[WARN] ensure resident_messages failed:", e)
 
 
-ensure_support_tables()
+if not _is_spawn_child:
+    ensure_support_tables()
 
 
 def add_admin_notification(level: str, title: str, message: str):
@@ -246,6 +443,21 @@ def make_initial_password(phone):
     return "123456"
 
 
+# ====== INDEX BIỂN SỐ ĐÃ BIẾT (snap kết quả OCR gần đúng) ======
+def _load_known_plates():
+    rows = query_all("SELECT plate FROM resident_vehicles") or []
+    rows += query_all("SELECT plate FROM guest_sessions WHERE status='open'") or []
+    return [r["plate"] for r in rows if r.get("plate")]
+
+
+plate_index = PlateIndex(
+    _load_known_plates,
+    ttl=Config.PLATE_INDEX_TTL,
+    max_distance=Config.PLATE_SNAP_MAX_DIST,
+    max_conf=Config.PLATE_SNAP_MAX_CONF,
+)
+
+
 # =========================================================
 #                    ROUTES CHUNG
 # =========================================================
@@ -689,16 +901,13 @@ def admin_create_resident():
         flash("Họ tên là bắt buộc", "danger")
         return redirect(url_for("admin_residents"))
 
-    execute(
+    resident_id = execute(
         """
         INSERT INTO residents (full_name, floor, room, cccd, email, phone)
         VALUES (%s, %s, %s, %s, %s, %s)
         """,
         (full_name, floor, room, citizen_id, email, phone),
-    )
-
-    new_resident = query_one("SELECT * FROM residents ORDER BY id DESC LIMIT 1")
-    resident_id = new_resident["id"]
+    ).lastrowid
 
     username = make_username(full_name, phone)
     raw_password = make_initial_password(phone)
@@ -722,6 +931,7 @@ def admin_create_resident():
             """,
             (resident_id, plate_number.strip().upper()),
         )
+        plate_index.invalidate()
 
     backup_code = f"{random.randint(0, 999999):06d}"
     execute(
@@ -782,6 +992,16 @@ def admin_delete_resident_real(resident_id):
     except Exception as e:
         print("[WARN] delete residents failed:", e)
 
+    plate_index.invalidate()
+    face_ref_cache.invalidate(resident_id)
+
+    # xoá encoding khỏi kho khuôn mặt + ANN index (id lưu dạng chuỗi, xem face_enroll)
+    try:
+        from frontend.ai.face_recognition import remove_resident_face
+        remove_resident_face(str(resident_id))
+    except Exception as e:
+        print("[WARN] remove_resident_face failed:", e)
+
     flash("Đã xóa cư dân khỏi danh sách.", "warning")
     return redirect(url_for("admin_residents"))
 
@@ -1220,6 +1440,7 @@ def gate_capture():
 
         plate_image = data.get("plate_image")          # có thể là dataURL/base64/path
         manual_plate = (data.get("plate_text_manual") or "").strip().upper()
+        kiosk_id = str(data.get("kiosk_id") or request.remote_addr or "default")[:64]
 
         def _to_image_bytes(val):
             """
@@ -1280,11 +1501,53 @@ def gate_capture():
                       (len(plate_image) if isinstance(plate_image, str) else "N/A"))
                 return jsonify({"ok": False, "message": "Không nhận được ảnh biển số từ camera."}), 200
 
+            if motion_gate is not None:
+                changed, _ = motion_gate.should_process(kiosk_id, img_bytes)
+                if not changed:
+                    return jsonify({"ok": False, "idle": True, "message": "Đang chờ xe vào làn…"}), 200
+
+            digest = frame_digest(img_bytes)
+            # fast path chỉ được nhận khi ra đúng biển số đã đăng ký / phiên khách đang mở,
+            # hoặc biển đang dẫn đầu cửa sổ bỏ phiếu (xác nhận lại bằng chứng cũ, khỏi OCR đầy đủ)
+            fastpath_plates = plate_index.canonical_plates()
+            leader = plate_voter.leader(kiosk_id) if Config.PLATE_VOTE_ENABLED else None
+            if leader:
+                fastpath_plates = fastpath_plates | {_normalize_raw_text(leader)}
+
             try:
-                plate_text = (read_plate_from_image(img_bytes) or "").strip().upper()
+                ocr_plate, ocr_conf = plate_cache.get_or_compute(
+                    img_bytes,
+                    lambda b: ocr_pool.read_plate_scored(b, lane=kiosk_id, fastpath_plates=fastpath_plates),
+                    kiosk_id=kiosk_id,
+                    digest=digest,
+                )
+            except OCRPoolBusy:
+                return jsonify({"ok": False, "message": "Hệ thống đang bận nhận diện. Vui lòng chờ giây lát."}), 200
             except Exception as e:
                 print("[WARN] OCR read_plate_from_image failed:", e)
-                plate_text = ""
+                ocr_plate, ocr_conf = None, 0.0
+
+            ocr_plate = normalize_plate(ocr_plate or "")
+
+            if ocr_plate and Config.PLATE_SNAP_ENABLED:
+                # đọc không chắc -> snap về biển số đã đăng ký / phiên khách đang mở
+                ocr_plate = plate_index.snap(ocr_plate, ocr_conf) or ocr_plate
+
+            if motion_gate is not None:
+                motion_gate.update(kiosk_id, idle=not ocr_plate)
+
+            if Config.PLATE_VOTE_ENABLED:
+                # cộng dồn bằng chứng qua các frame, chỉ chốt khi đủ điểm
+                # frame trùng (camera đứng hình, kết quả lấy từ cache) không được bỏ phiếu lại
+                plate_text, vote = plate_voter.add(kiosk_id, ocr_plate or None, ocr_conf, frame_key=digest)
+                if not plate_text and vote["leader"]:
+                    return jsonify({
+                        "ok": False,
+                        "message": f"Đang xác nhận biển số {vote['leader']}…",
+                    }), 200
+                plate_text = plate_text or ""
+            else:
+                plate_text = ocr_plate
 
         plate_text = (
             plate_text.replace(" ", "")
@@ -1319,14 +1582,15 @@ def gate_capture():
             is_in = int(veh_row.get("is_in_parking") or 0)
 
             if is_in == 0:
-                execute("UPDATE resident_vehicles SET is_in_parking=1 WHERE id=%s", (veh_row["id"],))
-                execute(
-                    """
-                    INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
-                    VALUES (%s,'resident_in','resident',%s,NULL,%s)
-                    """,
-                    (now, resident_id, plate_text),
-                )
+                with transaction() as tx:
+                    tx.execute("UPDATE resident_vehicles SET is_in_parking=1 WHERE id=%s", (veh_row["id"],))
+                    tx.execute(
+                        """
+                        INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
+                        VALUES (%s,'resident_in','resident',%s,NULL,%s)
+                        """,
+                        (now, resident_id, plate_text),
+                    )
                 return jsonify({
                     "ok": True,
                     "action": "redirect",
@@ -1365,24 +1629,20 @@ def gate_capture():
             }), 200
 
         ticket_code = f"{random.randint(0, 999999):06d}"
-        execute(
-            "INSERT INTO guest_sessions(plate, ticket_code, checkin_time, status) VALUES (%s,%s,%s,'open')",
-            (plate_text, ticket_code, now),
-        )
-
-        created = query_one(
-            "SELECT id FROM guest_sessions WHERE plate=%s AND ticket_code=%s ORDER BY id DESC LIMIT 1",
-            (plate_text, ticket_code),
-        )
-        guest_session_id = created["id"] if created else None
+        with transaction() as tx:
+            guest_session_id = tx.execute(
+                "INSERT INTO guest_sessions(plate, ticket_code, checkin_time, status) VALUES (%s,%s,%s,'open')",
+                (plate_text, ticket_code, now),
+            ).lastrowid
 
-        execute(
-            """
-            INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
-            VALUES (%s,'guest_in','guest',NULL,%s,%s)
-            """,
-            (now, guest_session_id, plate_text),
-        )
+            tx.execute(
+                """
+                INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
+                VALUES (%s,'guest_in','guest',NULL,%s,%s)
+                """,
+                (now, guest_session_id, plate_text),
+            )
+        plate_index.invalidate()
 
         return jsonify({
             "ok": True,
@@ -1412,13 +1672,6 @@ def gate_face_capture():
         if not resident_id:
             return jsonify({"ok": False, "message": "Thiếu resident_id."}), 400
 
-        ref_face_path = None
-        try:
-            row = query_one("SELECT face_image FROM residents WHERE id=%s LIMIT 1", (resident_id,))
-            ref_face_path = row["face_image"] if row else None
-        except Exception as e:
-            print("[WARN] residents.face_image not available:", e)
-
         def decode_data_url(d):
             if not d or not isinstance(d, str) or not d.startswith("data:image"):
                 return None
@@ -1428,43 +1681,74 @@ def gate_face_capture():
             except Exception:
                 return None
 
-        face_bytes = decode_data_url(face_data)
+        # trạng thái lượt xác thực (resident_id, biển số): đã quyết định / đang xử lý frame khác
+        # thì không decode + encode frame này nữa
+        face_key = (str(resident_id), plate_text)
+        verdict = FACE_REJECTED if backup_code else face_sessions.begin(face_key)
+        if verdict == FACE_BUSY:
+            return jsonify({"ok": False, "pending": True, "message": "Đang xác thực khuôn mặt…"}), 200
 
         face_ok = False
-        if face_recognition and ref_face_path and face_bytes:
+        if verdict == FACE_PROCESS:
+            ref_face_path = None
             try:
-                rel = (ref_face_path or "").replace("\\", "/").lstrip("/")
-                ref_full = Path(app.static_folder) / rel
-                if ref_full.exists():
-                    ref_img = face_recognition.load_image_file(str(ref_full))
-                    ref_encs = face_recognition.face_encodings(ref_img)
-
-                    live_img = face_recognition.load_image_file(io.BytesIO(face_bytes))
-                    live_encs = face_recognition.face_encodings(live_img)
-
-                    if ref_encs and live_encs:
-                        dist = float(face_recognition.face_distance([ref_encs[0]], live_encs[0])[0])
-                        threshold = 0.60
-                        face_ok = dist <= threshold
-                        print(f"[DEBUG] face_distance={dist:.4f} threshold={threshold}")
+                row = query_one("SELECT face_image FROM residents WHERE id=%s LIMIT 1", (resident_id,))
+                ref_face_path = row["face_image"] if row else None
+            except Exception as e:
+                print("[WARN] residents.face_image not available:", e)
+
+            face_bytes = decode_data_url(face_data)
+            dist, usable = None, bool(face_recognition and ref_face_path)
+            try:
+                if usable and face_bytes:
+                    rel = (ref_face_path or "").replace("\\", "/").lstrip("/")
+                    ref_full = Path(app.static_folder) / rel
+                    ref_enc = face_ref_cache.get(resident_id, str(ref_full))
+                    usable = ref_enc is not None
+                    if usable:
+                        # detect trên bản thu nhỏ, encode đúng 1 mặt; không có / nhiều mặt -> bỏ frame
+                        live_img, _ = load_image_rgb(face_bytes, FACE_MAX_SIDE)
+                        live_enc, face_status = encode_single_face(live_img)
+
+                        if face_status == FACE_OK:
+                            dist = float(face_recognition.face_distance([ref_enc], live_enc)[0])
+                            print(f"[DEBUG] face_distance={dist:.4f} threshold={face_sessions.threshold}")
+                        else:
+                            print(f"[DEBUG] face frame skipped: {face_status}")
             except Exception as e:
                 print("[WARN] face verify error:", e)
+            finally:
+                verdict = face_sessions.finish(face_key, dist, usable=usable)
+            face_ok = verdict == FACE_VERIFIED
 
         if face_ok:
             now = datetime.now()
-            execute(
-                "UPDATE resident_vehicles SET is_in_parking=0 WHERE resident_id=%s AND UPPER(plate)=%s",
-                (resident_id, plate_text),
-            )
-            execute(
-                """
-                INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
-                VALUES (%s, %s, 'resident', %s, NULL, %s)
-                """,
-                (now, "resident_out", resident_id, plate_text),
-            )
+            try:
+                with transaction() as tx:
+                    tx.execute(
+                        "UPDATE resident_vehicles SET is_in_parking=0 WHERE resident_id=%s AND UPPER(plate)=%s",
+                        (resident_id, plate_text),
+                    )
+                    tx.execute(
+                        """
+                        INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
+                        VALUES (%s, %s, 'resident', %s, NULL, %s)
+                        """,
+                        (now, "resident_out", resident_id, plate_text),
+                    )
+            finally:
+                # ghi xong -> lượt kết thúc; ghi lỗi -> frame sau xác thực + ghi lại
+                face_sessions.close(face_key)
             return jsonify({"ok": True, "redirect_url": url_for("gate_message", kind="goodbye")}), 200
 
+        if verdict == FACE_PENDING:
+            done, total = face_sessions.progress(face_key)
+            return jsonify({
+                "ok": False,
+                "pending": True,
+                "message": f"Đang xác thực khuôn mặt… ({done}/{total})",
+            }), 200
+
         if not backup_code:
             return jsonify({
                 "ok": False,
@@ -1490,17 +1774,19 @@ def gate_face_capture():
             }), 200
 
         now = datetime.now()
-        execute(
-            "UPDATE resident_vehicles SET is_in_parking=0 WHERE resident_id=%s AND UPPER(plate)=%s",
-            (resident_id, plate_text),
-        )
-        execute(
-            """
-            INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
-            VALUES (%s, %s, 'resident', %s, NULL, %s)
-            """,
-            (now, "resident_out", resident_id, plate_text),
-        )
+        with transaction() as tx:
+            tx.execute(
+                "UPDATE resident_vehicles SET is_in_parking=0 WHERE resident_id=%s AND UPPER(plate)=%s",
+                (resident_id, plate_text),
+            )
+            tx.execute(
+                """
+                INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
+                VALUES (%s, %s, 'resident', %s, NULL, %s)
+                """,
+                (now, "resident_out", resident_id, plate_text),
+            )
+        face_sessions.close(face_key)
 
         return jsonify({"ok": True, "redirect_url": url_for("gate_message", kind="goodbye")}), 200
 
@@ -1551,6 +1837,26 @@ def admin_gate_unlock():
     return jsonify({"ok": True, "message": "Đã mở khóa trạm và reset khóa nhập mã vé."}), 200
 
 
+@app.route("/admin/ocr/stats", methods=["GET"])
+def admin_ocr_stats():
+    if session.get("role") != "admin":
+        return jsonify({"ok": False, "message": "Unauthorized"}), 401
+
+    return jsonify({
+        "ok": True,
+        "models": MODEL_STATUS,
+        "ocr_pool": ocr_pool.stats(),
+        "ocr_cache": plate_cache.stats(),
+        "ocr_variants": ocr_variant_stats.snapshot() if ocr_variant_stats else {},
+        "motion_gate": motion_gate.stats() if motion_gate else {},
+        "plate_index": plate_index.stats(),
+        "face_ref_cache": face_ref_cache.stats(),
+        "face_sessions": face_sessions.stats(),
+        "db_pool": pool_stats(),
+        "db_queries": query_stats(),
+    }), 200
+
+
 # =========================================================
 #  Trang thông báo / hiện mã vé / nhập mã vé
 # =========================================================
@@ -1639,14 +1945,19 @@ def gate_guest_verify():
             (session_id,)
         )
 
-        if not att:
-            execute(
-                "INSERT INTO guest_ticket_attempts (guest_session_id, attempt_count, locked_until, updated_at) "
-                "VALUES (%s,0,NULL,%s)",
-                (session_id, now)
-            )
+        # chưa có dòng đếm số lần thử -> tạo trong cùng transaction với lần ghi bên dưới
+        att_missing = not att
+        if att_missing:
             att = {"attempt_count": 0, "locked_until": None}
 
+        def ensure_attempt_row(tx):
+            if att_missing:
+                tx.execute(
+                    "INSERT INTO guest_ticket_attempts (guest_session_id, attempt_count, locked_until, updated_at) "
+                    "VALUES (%s,0,NULL,%s)",
+                    (session_id, now)
+                )
+
         attempt_count = int(att.get("attempt_count") or 0)
 
         gs = query_one(
@@ -1660,12 +1971,6 @@ def gate_guest_verify():
         real_plate = (gs.get("plate") or plate or "").strip().upper()
 
         if real_code and ticket_code == real_code:
-            execute(
-                "UPDATE guest_ticket_attempts SET attempt_count=0, locked_until=NULL, updated_at=%s "
-                "WHERE guest_session_id=%s",
-                (now, session_id)
-            )
-
             checkin_time = gs.get("checkin_time")
             fee = 0
             if checkin_time:
@@ -1674,18 +1979,25 @@ def gate_guest_verify():
                 hours_rounded = int(hours) if hours.is_integer() else int(hours) + 1
                 fee = hours_rounded * 5000
 
-            execute(
-                "UPDATE guest_sessions SET status='closed', checkout_time=%s, fee=%s WHERE id=%s",
-                (now, fee, session_id)
-            )
-
-            execute(
-                """
-                INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
-                VALUES (%s,'guest_out','guest',NULL,%s,%s)
-                """,
-                (now, session_id, real_plate),
-            )
+            with transaction() as tx:
+                ensure_attempt_row(tx)
+                tx.execute(
+                    "UPDATE guest_ticket_attempts SET attempt_count=0, locked_until=NULL, updated_at=%s "
+                    "WHERE guest_session_id=%s",
+                    (now, session_id)
+                )
+                tx.execute(
+                    "UPDATE guest_sessions SET status='closed', checkout_time=%s, fee=%s WHERE id=%s",
+                    (now, fee, session_id)
+                )
+                tx.execute(
+                    """
+                    INSERT INTO parking_logs(event_time, event_type, user_type, resident_id, guest_session_id, plate)
+                    VALUES (%s,'guest_out','guest',NULL,%s,%s)
+                    """,
+                    (now, session_id, real_plate),
+                )
+            plate_index.invalidate()
 
             return jsonify({
                 "ok": True,
@@ -1700,11 +2012,13 @@ def gate_guest_verify():
                 f"Khóa trạm do nhập sai mã vé {MAX_TICKET_FAILS} lần. Plate: {real_plate} Session: {session_id}"
             )
 
-            execute(
-                "UPDATE guest_ticket_attempts SET attempt_count=%s, locked_until=%s, updated_at=%s "
-                "WHERE guest_session_id=%s",
-                (attempt_count, now + timedelta(minutes=LOCK_MINUTES), now, session_id)
-            )
+            with transaction() as tx:
+                ensure_attempt_row(tx)
+                tx.execute(
+                    "UPDATE guest_ticket_attempts SET attempt_count=%s, locked_until=%s, updated_at=%s "
+                    "WHERE guest_session_id=%s",
+                    (attempt_count, now + timedelta(minutes=LOCK_MINUTES), now, session_id)
+                )
 
             add_admin_notification(
                 "danger",
@@ -1718,10 +2032,12 @@ def gate_guest_verify():
                 "message": f"Bạn đã nhập sai {MAX_TICKET_FAILS} lần. Trạm đã khóa và đã báo Admin."
             }), 200
 
-        execute(
-            "UPDATE guest_ticket_attempts SET attempt_count=%s, updated_at=%s WHERE guest_session_id=%s",
-            (attempt_count, now, session_id)
-        )
+        with transaction() as tx:
+            ensure_attempt_row(tx)
+            tx.execute(
+                "UPDATE guest_ticket_attempts SET attempt_count=%s, updated_at=%s WHERE guest_session_id=%s",
+                (attempt_count, now, session_id)
+            )
 
         remaining = MAX_TICKET_FAILS - attempt_count
         return jsonify({
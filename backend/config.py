@@ -26,6 +26,76 @@ class Config:
     DB_USER = os.getenv("DB_USER", "sp_user")
     DB_PASSWORD = os.getenv("DB_PASSWORD", "sppassword")
 
+    # Pool connection MySQL (backend/db.py): số connection tối đa, thời gian chờ khi pool cạn,
+    # tuổi tối đa của 1 connection, ping connection đã idle quá DB_POOL_PING_AFTER giây
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 8))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))
+    DB_POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", 10))
+    # Số prepared statement giữ trên mỗi connection (0 = tắt, chạy câu lệnh dạng text).
+    # Tắt mặc định: connector 9.x pure-Python tốn thêm 1 round trip (COM_STMT_RESET) mỗi lần chạy
+    DB_STMT_CACHE_SIZE = int(os.getenv("DB_STMT_CACHE_SIZE", 0))
+    # Đo thời gian câu lệnh, đếm số câu / request, log câu chậm, cảnh báo N+1 (tắt mặc định)
+    DB_INSTRUMENT = os.getenv("DB_INSTRUMENT", "0") == "1"
+    DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", 200))
+    DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", 5))
+
     # SECRET_KEY cho Flask (dùng cho session, flash message, v.v.)
     # Khi deploy thật thì nên đổi sang chuỗi random dài, hoặc dùng biến môi trường.
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
+
+    # OCR BIỂN SỐ: pool tiến trình (mỗi worker load EasyOCR 1 lần)
+    # OCR_POOL_SIZE = 0 -> OCR ngay trong tiến trình Flask như trước
+    OCR_POOL_SIZE = int(os.getenv("OCR_POOL_SIZE", 2))
+    OCR_QUEUE_SIZE = int(os.getenv("OCR_QUEUE_SIZE", 4))
+    OCR_JOB_TIMEOUT = float(os.getenv("OCR_JOB_TIMEOUT", 8))
+    OCR_THREADS_PER_WORKER = int(os.getenv("OCR_THREADS_PER_WORKER", 1))
+
+    # Warm-up model OCR + face lúc khởi động (thread nền), xem /healthz/ready
+    MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+    # Warm-up lỗi (worker crash, timeout...) -> /healthz/ready chạy lại sau ngần này giây
+    MODEL_WARMUP_RETRY_SECONDS = float(os.getenv("MODEL_WARMUP_RETRY_SECONDS", 30))
+
+    # Cache kết quả OCR theo nội dung ảnh (OCR_CACHE_SIZE = 0 -> tắt)
+    OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", 256))
+    OCR_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", 30))
+    OCR_CACHE_NEGATIVE_TTL = float(os.getenv("OCR_CACHE_NEGATIVE_TTL", 3))
+
+    # Bỏ phiếu biển số qua nhiều frame cho mỗi kiosk (PLATE_VOTE_ENABLED = 0 -> chốt từng frame như cũ)
+    PLATE_VOTE_ENABLED = os.getenv("PLATE_VOTE_ENABLED", "1") == "1"
+    PLATE_VOTE_WINDOW = float(os.getenv("PLATE_VOTE_WINDOW", 6))
+    PLATE_VOTE_COMMIT_SCORE = float(os.getenv("PLATE_VOTE_COMMIT_SCORE", 1.0))
+    PLATE_VOTE_STRONG_CONF = float(os.getenv("PLATE_VOTE_STRONG_CONF", 0.8))
+
+    # Thứ tự biến thể tiền xử lý OCR thích nghi theo thống kê từng làn
+    OCR_ADAPTIVE_VARIANTS = os.getenv("OCR_ADAPTIVE_VARIANTS", "1") == "1"
+    OCR_VARIANT_MIN_SAMPLES = int(os.getenv("OCR_VARIANT_MIN_SAMPLES", 30))
+    OCR_VARIANT_SKIP_BELOW = float(os.getenv("OCR_VARIANT_SKIP_BELOW", 0.02))
+
+    # Bỏ qua OCR khi cảnh không đổi (so ảnh xám 64x48 với frame OCR gần nhất)
+    MOTION_GATE_ENABLED = os.getenv("MOTION_GATE_ENABLED", "1") == "1"
+    MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", 6.0))
+    MOTION_MAX_SKIP_SECONDS = float(os.getenv("MOTION_MAX_SKIP_SECONDS", 10))
+
+    # Snap biển số OCR gần đúng về biển số đã đăng ký / phiên khách đang mở (BK-tree)
+    PLATE_SNAP_ENABLED = os.getenv("PLATE_SNAP_ENABLED", "1") == "1"
+    PLATE_SNAP_MAX_DIST = int(os.getenv("PLATE_SNAP_MAX_DIST", 1))
+    # Chỉ snap gần đúng khi conf OCR dưới ngưỡng này (và có đúng 1 biển gần nhất)
+    PLATE_SNAP_MAX_CONF = float(os.getenv("PLATE_SNAP_MAX_CONF", 0.6))
+    # Fast path template (plate_fastpath): conf là điểm NCC, thang riêng với EasyOCR
+    # - PLATE_FASTPATH_MIN_CONF: ngưỡng NCC của ký tự kém nhất
+    # - PLATE_FASTPATH_VOTE_CONF: conf báo cho PlateVoter khi nhận kết quả fast path
+    #   (biển số đã đăng ký); < PLATE_VOTE_STRONG_CONF => vẫn phải bỏ phiếu qua nhiều frame
+    PLATE_FASTPATH_MIN_CONF = float(os.getenv("PLATE_FASTPATH_MIN_CONF", 0.75))
+    PLATE_FASTPATH_VOTE_CONF = float(os.getenv("PLATE_FASTPATH_VOTE_CONF", 0.5))
+    PLATE_INDEX_TTL = float(os.getenv("PLATE_INDEX_TTL", 30))
+
+    # Số cư dân tối đa giữ encoding ảnh khuôn mặt tham chiếu trong RAM
+    FACE_REF_CACHE_SIZE = int(os.getenv("FACE_REF_CACHE_SIZE", 1024))
+
+    # Xác thực khuôn mặt theo lượt: ngưỡng khoảng cách, số frame tối đa trước khi hỏi mã 6 số
+    FACE_VERIFY_THRESHOLD = float(os.getenv("FACE_VERIFY_THRESHOLD", 0.60))
+    FACE_VERIFY_MAX_FRAMES = int(os.getenv("FACE_VERIFY_MAX_FRAMES", 5))
+    FACE_VERIFY_REJECT_MEAN = float(os.getenv("FACE_VERIFY_REJECT_MEAN", 0.75))
+    FACE_SESSION_TTL = float(os.getenv("FACE_SESSION_TTL", 60))
@@ -1,11 +1,227 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
 import mysql.connector
 from mysql.connector import Error
+from mysql.connector.constants import FieldFlag
 from .config import Config
 from backend.config import Config
 
+
+class PoolTimeout(Error):
+    """Hết connection trong pool và chờ quá DB_POOL_TIMEOUT giây."""
+
+
+# Kết quả của execute / execute_many: id tự tăng vừa INSERT (None nếu không có) + số dòng bị ảnh hưởng
+WriteResult = namedtuple("WriteResult", ["lastrowid", "rowcount"])
+
+
+# ---------- Đo đạc câu lệnh (DB_INSTRUMENT=1) ----------
+# - thời gian từng câu, số câu / request (begin_request / end_request, app.py gọi)
+# - log câu chậm hơn DB_SLOW_QUERY_MS
+# - cảnh báo N+1: cùng 1 "dạng" câu lệnh chạy >= DB_N_PLUS_ONE_THRESHOLD lần trong 1 request
+_instr_local = threading.local()
+_query_stats = {}  # dạng câu lệnh -> {"count", "total_ms", "max_ms"}
+_query_stats_lock = threading.Lock()
+
+_WS_RE = re.compile(r"\s+")
+_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+\b")
+
+
+def _shape(sql):
+    """Chuẩn hoá câu SQL để gom nhóm: bỏ khoảng trắng thừa, hằng số -> ?."""
+    return _LITERAL_RE.sub("?", _WS_RE.sub(" ", sql).strip())
+
+
+def begin_request(name=None):
+    """Bắt đầu đếm câu lệnh cho 1 request (không làm gì khi tắt DB_INSTRUMENT)."""
+    if Config.DB_INSTRUMENT:
+        _instr_local.req = {"name": name, "count": 0, "ms": 0.0, "shapes": {}}
+
+
+def end_request():
+    """Kết thúc request: trả về {"name", "count", "ms"} hoặc None nếu không đo."""
+    req = getattr(_instr_local, "req", None)
+    _instr_local.req = None
+    if req is None:
+        return None
+    return {"name": req["name"], "count": req["count"], "ms": round(req["ms"], 2)}
+
+
+def _record(sql, ms):
+    shape = _shape(sql)
+    with _query_stats_lock:
+        st = _query_stats.setdefault(shape, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        st["count"] += 1
+        st["total_ms"] += ms
+        st["max_ms"] = max(st["max_ms"], ms)
+
+    if ms >= Config.DB_SLOW_QUERY_MS:
+        print(f"[WARN] Slow query {ms:.1f}ms: {shape[:300]}")
+
+    req = getattr(_instr_local, "req", None)
+    if req is None:
+        return
+    req["count"] += 1
+    req["ms"] += ms
+    n = req["shapes"].get(shape, 0) + 1
+    req["shapes"][shape] = n
+    if n == Config.DB_N_PLUS_ONE_THRESHOLD:
+        print(f"[WARN] N+1? {req['name'] or 'request'} chạy cùng 1 câu lệnh {n} lần: {shape[:300]}")
+
+
+@contextmanager
+def _instrument(sql):
+    if not Config.DB_INSTRUMENT:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(sql, (time.perf_counter() - t0) * 1000.0)
+
+
+def query_stats(limit=20):
+    """Các dạng câu lệnh tốn thời gian nhất kể từ khi khởi động (rỗng khi tắt DB_INSTRUMENT)."""
+    with _query_stats_lock:
+        items = sorted(_query_stats.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)[:limit]
+        return [
+            {
+                "sql": shape,
+                "count": st["count"],
+                "total_ms": round(st["total_ms"], 1),
+                "avg_ms": round(st["total_ms"] / st["count"], 2),
+                "max_ms": round(st["max_ms"], 2),
+            }
+            for shape, st in items
+        ]
+
+
+# Cache prepared statement phía server cho mỗi connection trong pool (câu SQL -> cursor prepared).
+# Chỉ áp dụng cho câu lệnh có tham số. TẮT mặc định (DB_STMT_CACHE_SIZE=0): với
+# mysql-connector 9.x bản pure-Python, chạy lại cursor prepared gửi COM_STMT_RESET trước
+# COM_STMT_EXECUTE => 2 round trip thay vì 1 như câu lệnh text. Chỉ bật khi đã đo thấy lợi
+# trên connector đang dùng (vd. C extension).
+_stmt_stats = {"hits": 0, "prepared": 0, "evicted": 0}
+_stmt_lock = threading.Lock()
+
+
+def _stmt_count(key):
+    with _stmt_lock:
+        _stmt_stats[key] += 1
+
+
+def _prepared_cursor(conn, sql):
+    """Cursor prepared của câu `sql` trên connection này (LRU DB_STMT_CACHE_SIZE câu)."""
+    cache = getattr(conn, "_stmt_cache", None)
+    if cache is None:
+        cache = OrderedDict()
+        conn._stmt_cache = cache
+
+    cursor = cache.get(sql)
+    if cursor is not None:
+        cache.move_to_end(sql)
+        _stmt_count("hits")
+        return cursor
+
+    cursor = conn.cursor(prepared=True)
+    cache[sql] = cursor
+    _stmt_count("prepared")
+    while len(cache) > Config.DB_STMT_CACHE_SIZE:
+        _, old = cache.popitem(last=False)
+        _stmt_count("evicted")
+        try:
+            old.close()  # DEALLOCATE trên server
+        except Exception:
+            pass
+    return cursor
+
+
+def _drop_prepared(conn, sql):
+    cursor = getattr(conn, "_stmt_cache", {}).pop(sql, None)
+    if cursor is not None:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+
+def _use_prepared(params):
+    return Config.DB_STMT_CACHE_SIZE > 0 and bool(params)
+
+
+def _text_columns(cursor):
+    """Cờ "cột chữ" theo cursor.description: cột BINARY / BLOB / VARBINARY giữ nguyên bytes."""
+    return [not (int(d[7] or 0) & FieldFlag.BINARY) for d in cursor.description or ()]
+
+
+def _decode(value, is_text):
+    # giao thức binary của prepared statement trả cột chữ dạng bytearray
+    if isinstance(value, bytearray):
+        if is_text:
+            try:
+                return value.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        return bytes(value)
+    return value
+
+
+def _select(conn, sql, params):
+    """Chạy SELECT, trả về list dict (đã đọc hết kết quả)."""
+    if not _use_prepared(params):
+        cursor = conn.cursor(dictionary=True, buffered=True)
+        with _instrument(sql):
+            cursor.execute(sql, params or ())
+            rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    cursor = _prepared_cursor(conn, sql)
+    try:
+        with _instrument(sql):
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+    except Exception:
+        _drop_prepared(conn, sql)
+        raise
+    cols = cursor.column_names
+    text = _text_columns(cursor)
+    return [dict(zip(cols, (_decode(v, t) for v, t in zip(row, text)))) for row in rows]
+
+
+def _write(conn, sql, params, many=False):
+    if many or not _use_prepared(params):
+        # executemany đi đường thường: connector gộp INSERT nhiều dòng thành 1 câu
+        cursor = conn.cursor()
+        with _instrument(sql):
+            if many:
+                cursor.executemany(sql, params)
+            else:
+                cursor.execute(sql, params or ())
+        result = WriteResult(cursor.lastrowid or None, cursor.rowcount)
+        cursor.close()
+        return result
+
+    cursor = _prepared_cursor(conn, sql)
+    try:
+        with _instrument(sql):
+            cursor.execute(sql, params)
+    except Exception:
+        _drop_prepared(conn, sql)
+        raise
+    return WriteResult(cursor.lastrowid or None, cursor.rowcount)
+
+
 def get_connection():
     """
-    Tạo và trả về 1 connection tới MySQL.
+    Tạo và trả về 1 connection MỚI tới MySQL (không qua pool).
+    Các helper bên dưới mượn connection từ pool thay vì gọi hàm này mỗi câu lệnh.
     """
     return mysql.connector.connect(
         host=Config.DB_HOST,
@@ -13,39 +229,285 @@ def get_connection():
         database=Config.DB_NAME,
         user=Config.DB_USER,
         password=Config.DB_PASSWORD,
+        # mỗi câu lệnh tự commit => connection trả về pool không giữ snapshot đọc cũ
+        autocommit=True,
     )
 
+
+class ConnectionPool:
+    """
+    Pool connection dùng chung cho cả tiến trình:
+    - tối đa `size` connection; hết thì chờ tối đa `timeout` giây rồi báo PoolTimeout
+    - LIFO: connection vừa trả được dùng lại trước (ít bị server đóng vì idle)
+    - connection sống quá `recycle` giây bị đóng và mở lại
+    - connection idle quá `ping_after` giây được ping trước khi giao (0 = luôn ping)
+    """
+
+    def __init__(self, size=8, timeout=5.0, recycle=1800.0, pre_ping=True, ping_after=10.0):
+        self.size = max(1, int(size))
+        self.timeout = float(timeout)
+        self.recycle = float(recycle)
+        self.pre_ping = pre_ping
+        self.ping_after = float(ping_after)
+
+        # ngăn xếp LIFO, phần tử: (connection, thời điểm tạo, thời điểm trả về pool)
+        self._idle = []
+        self._total = 0
+        self._lock = threading.Lock()
+        # báo cho thread đang chờ khi có connection được trả / slot được giải phóng
+        self._cond = threading.Condition(self._lock)
+        self._stats = {
+            "created": 0, "reused": 0, "recycled": 0, "ping_failed": 0,
+            "discarded": 0, "timeouts": 0, "wait_ms": 0.0, "peak_in_use": 0,
+        }
+        self._in_use = 0
+
+    def _new_entry(self):
+        conn = get_connection()
+        with self._lock:
+            self._stats["created"] += 1
+        return conn, time.monotonic()
+
+    def _replace(self, conn, reason):
+        """Đóng connection hỏng / quá tuổi, mở connection mới trên cùng slot."""
+        self._close_quietly(conn)
+        with self._lock:
+            self._stats[reason] += 1
+        try:
+            return self._new_entry()
+        except Exception:
+            self._drop_slot()
+            raise
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _drop_slot(self):
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    def _take(self, deadline):
+        """Chờ tới khi có connection idle (trả về entry) hoặc slot trống (trả về None)."""
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._total < self.size:
+                    self._total += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"DB pool cạn ({self.size} connection) sau {self.timeout}s")
+                self._cond.wait(remaining)
+
+    def acquire(self):
+        """Mượn 1 connection: (conn, thời điểm tạo). Trả lại bằng release()."""
+        t0 = time.monotonic()
+        idle = self._take(t0 + self.timeout)
+        if idle is None:
+            try:
+                entry = self._new_entry()
+            except Exception:
+                self._drop_slot()
+                raise
+        else:
+            conn, created, returned = idle
+            now = time.monotonic()
+            entry = None
+            if self.recycle > 0 and now - created > self.recycle:
+                entry = self._replace(conn, "recycled")
+            elif self.pre_ping and now - returned >= self.ping_after:
+                try:
+                    conn.ping(reconnect=False)
+                except Exception:
+                    entry = self._replace(conn, "ping_failed")
+            if entry is None:
+                with self._lock:
+                    self._stats["reused"] += 1
+                entry = (conn, created)
+
+        with self._lock:
+            self._in_use += 1
+            self._stats["peak_in_use"] = max(self._stats["peak_in_use"], self._in_use)
+            self._stats["wait_ms"] += (time.monotonic() - t0) * 1000.0
+        return entry
+
+    def release(self, entry, discard=False):
+        conn, created = entry
+        with self._lock:
+            self._in_use -= 1
+        if not discard:
+            try:
+                # câu lệnh dở dang / transaction chưa kết thúc -> huỷ trước khi cho mượn lại
+                if conn.in_transaction:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self._close_quietly(conn)
+            with self._lock:
+                self._stats["discarded"] += 1
+            self._drop_slot()
+            return
+        with self._cond:
+            self._idle.append((conn, created, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["wait_ms"] = round(data["wait_ms"], 1)
+            data["size"] = self.size
+            data["open"] = self._total
+            data["in_use"] = self._in_use
+            data["idle"] = len(self._idle)
+        return data
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool của tiến trình hiện tại (tạo lại sau fork: connection không dùng chung giữa tiến trình)."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _pool_lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ConnectionPool(
+                    size=Config.DB_POOL_SIZE,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    recycle=Config.DB_POOL_RECYCLE,
+                    pre_ping=Config.DB_POOL_PRE_PING,
+                    ping_after=Config.DB_POOL_PING_AFTER,
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def pool_stats():
+    """Số liệu sử dụng pool + cache prepared statement (hiển thị ở /admin/ocr/stats)."""
+    data = get_pool().stats()
+    with _stmt_lock:
+        data["stmt_cache"] = dict(_stmt_stats)
+    return data
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Mượn 1 connection từ pool trong khối with; lỗi kết nối -> connection bị bỏ, không trả về pool.
+    """
+    pool = get_pool()
+    entry = pool.acquire()
+    discard = False
+    try:
+        yield entry[0]
+    except (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError):
+        discard = True
+        raise
+    finally:
+        pool.release(entry, discard=discard)
+
+
 def query_one(sql, params=None):
     """
     Chạy SELECT trả về 1 dòng (hoặc None)
     """
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute(sql, params or ())
-    row = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return row
+    with pooled_connection() as conn:
+        # đọc hết kết quả để connection trả về pool không còn dòng chưa đọc
+        rows = _select(conn, sql, params)
+    return rows[0] if rows else None
 
 def query_all(sql, params=None):
     """
     Chạy SELECT trả về danh sách nhiều dòng
     """
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute(sql, params or ())
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with pooled_connection() as conn:
+        rows = _select(conn, sql, params)
     return rows
 
 def execute(sql, params=None):
     """
-    Chạy INSERT / UPDATE / DELETE
+    Chạy INSERT / UPDATE / DELETE, trả về WriteResult(lastrowid, rowcount)
+    """
+    with pooled_connection() as conn:
+        result = _write(conn, sql, params)
+        conn.commit()
+    return result
+
+def execute_many(sql, seq_params):
+    """
+    Chạy 1 câu INSERT / UPDATE cho nhiều bộ tham số trong 1 lần gọi (INSERT nhiều dòng được
+    connector gộp thành 1 câu). Trả về WriteResult(lastrowid của dòng đầu, tổng rowcount).
+    """
+    seq_params = list(seq_params)
+    if not seq_params:
+        return WriteResult(None, 0)
+    with pooled_connection() as conn:
+        result = _write(conn, sql, seq_params, many=True)
+        conn.commit()
+    return result
+
+
+class Transaction:
+    """
+    Các câu lệnh chạy trên CÙNG 1 connection trong khối `with transaction() as tx:`;
+    commit 1 lần khi khối kết thúc bình thường, rollback nếu có exception.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def query_one(self, sql, params=None):
+        rows = _select(self.conn, sql, params)
+        return rows[0] if rows else None
+
+    def query_all(self, sql, params=None):
+        return _select(self.conn, sql, params)
+
+    def execute(self, sql, params=None):
+        return _write(self.conn, sql, params)
+
+    def execute_many(self, sql, seq_params):
+        seq_params = list(seq_params)
+        if not seq_params:
+            return WriteResult(None, 0)
+        return _write(self.conn, sql, seq_params, many=True)
+
+
+@contextmanager
+def transaction():
+    """
+    Unit of work cho thao tác nhiều câu lệnh (VD: cập nhật xe + ghi parking_logs):
+
+        with transaction() as tx:
+            tx.execute("UPDATE resident_vehicles ...", (...))
+            tx.execute("INSERT INTO parking_logs ...", (...))
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(sql, params or ())
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with pooled_connection() as conn:
+        conn.start_transaction()
+        try:
+            yield Transaction(conn)
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
@@ -0,0 +1,204 @@
+# frontend/ai/bench_plate_ocr.py
+"""
+Benchmark OCR biển số trên 1 thư mục ảnh đã gán nhãn.
+
+Chạy (từ thư mục gốc repo):
+    python -m frontend.ai.bench_plate_ocr --images data/plates --out bench_result.json
+    python -m frontend.ai.bench_plate_ocr --images data/plates --compare bench_result.json
+
+Nhãn:
+- `labels.json` trong thư mục ảnh: {"ten_file.jpg": "59A12345", ...}, hoặc
+- tên file: `59A12345.jpg`, `59A12345_02.png` (phần trước dấu "_" đầu tiên)
+
+Báo cáo: thời gian từng bước (decode, preprocess:<biến thể>, readtext, extract_plate...),
+latency p50/p95/p99, FPS, độ chính xác khớp tuyệt đối; lưu JSON để so sánh giữa các lần chạy.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from frontend.ai import plate_recognition
+from frontend.ai.image_utils import PLATE_MAX_SIDE
+from frontend.ai.ocr_backends import PLATE_OCR_BACKEND
+from frontend.ai.plate_fastpath import PLATE_FASTPATH_MIN_CONF, fastpath_enabled
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def _clean_plate(text: Optional[str]) -> str:
+    return re.sub(r"[^A-Z0-9]", "", (text or "").upper())
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentile kiểu nearest-rank (p trong 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(p / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "total_ms": 0.0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "count": len(values),
+        "total_ms": round(sum(values), 3),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+    }
+
+
+def load_corpus(images_dir: Path) -> List[Dict[str, Any]]:
+    labels: Dict[str, str] = {}
+    labels_file = images_dir / "labels.json"
+    if labels_file.exists():
+        labels = json.loads(labels_file.read_text(encoding="utf-8"))
+
+    corpus = []
+    for p in sorted(images_dir.iterdir()):
+        if p.suffix.lower() not in IMAGE_EXTS:
+            continue
+        label = labels.get(p.name) or p.stem.split("_", 1)[0]
+        corpus.append({"path": p, "label": _clean_plate(label)})
+    return corpus
+
+
+def run_benchmark(images_dir: Path, repeat: int = 1, warmup: int = 1) -> Dict[str, Any]:
+    corpus = load_corpus(images_dir)
+    if not corpus:
+        raise SystemExit(f"Không có ảnh nào trong {images_dir}")
+
+    if not plate_recognition.warmup():
+        raise SystemExit("Không load được EasyOCR/OpenCV -> không benchmark được.")
+
+    # warm-up: chạy thử vài ảnh đầu, không tính vào kết quả
+    for item in corpus[:warmup]:
+        plate_recognition.read_plate_detailed(item["path"].read_bytes())
+
+    plate_recognition.enable_stage_timing(True)
+
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    per_image: List[Dict[str, Any]] = []
+    correct = correct_canon = 0
+
+    t_start = time.perf_counter()
+    for _ in range(max(1, repeat)):
+        for item in corpus:
+            data = item["path"].read_bytes()
+            plate_recognition.pop_stage_times()
+
+            t0 = time.perf_counter()
+            detail = plate_recognition.read_plate_detailed(data)
+            ms = (time.perf_counter() - t0) * 1000.0
+            latencies.append(ms)
+
+            for stage, values in plate_recognition.pop_stage_times().items():
+                stages.setdefault(stage, []).extend(values)
+
+            predicted = _clean_plate(detail.get("plate"))
+            ok = predicted == item["label"]
+            # khớp sau khi đưa cả nhãn về dạng chuẩn của OCR (O->0, B->8...)
+            ok_canon = plate_recognition._normalize_raw_text(predicted) == \
+                plate_recognition._normalize_raw_text(item["label"])
+            correct += ok
+            correct_canon += ok_canon
+
+            per_image.append({
+                "file": item["path"].name,
+                "label": item["label"],
+                "predicted": predicted or None,
+                "conf": round(float(detail.get("conf") or 0.0), 4),
+                "winner": detail.get("winner"),
+                "latency_ms": round(ms, 3),
+                "exact_match": ok,
+            })
+    wall = time.perf_counter() - t_start
+
+    plate_recognition.enable_stage_timing(False)
+
+    n = len(latencies)
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "images_dir": str(images_dir),
+        "config": {
+            "repeat": repeat,
+            "PLATE_OCR_BACKEND": PLATE_OCR_BACKEND,
+            "PLATE_LOCALIZE_ENABLED": plate_recognition.PLATE_LOCALIZE_ENABLED,
+            "PLATE_MAX_CANDIDATES": plate_recognition.PLATE_MAX_CANDIDATES,
+            "PLATE_OCR_BATCHED": plate_recognition.PLATE_OCR_BATCHED,
+            "PLATE_OCR_BATCH_SIZE": plate_recognition.PLATE_OCR_BATCH_SIZE,
+            "PLATE_MAX_SIDE": PLATE_MAX_SIDE,
+            "PLATE_FASTPATH": fastpath_enabled(),
+            "PLATE_FASTPATH_MIN_CONF": PLATE_FASTPATH_MIN_CONF,
+        },
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "frames": n,
+        "fps": round(n / wall, 3) if wall > 0 else 0.0,
+        "latency": _summary(latencies),
+        "accuracy": round(correct / n, 4) if n else 0.0,
+        "accuracy_canonical": round(correct_canon / n, 4) if n else 0.0,
+        "stages": {k: _summary(v) for k, v in sorted(stages.items())},
+        "images": per_image,
+    }
+
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    def _delta(cur: float, old: Optional[float]) -> str:
+        if old is None:
+            return ""
+        return f"  ({cur - old:+.3f})"
+
+    base_lat = (baseline or {}).get("latency", {})
+    print(f"Frames: {result['frames']}   FPS: {result['fps']}{_delta(result['fps'], (baseline or {}).get('fps'))}")
+    print(f"Accuracy (exact): {result['accuracy']:.2%}   (canonical): {result['accuracy_canonical']:.2%}")
+    for key in ("p50_ms", "p95_ms", "p99_ms", "mean_ms"):
+        print(f"Latency {key:<8} {result['latency'][key]:>10.2f}{_delta(result['latency'][key], base_lat.get(key))}")
+
+    print("\nStage                     count    mean_ms     p95_ms   total_ms")
+    base_stages = (baseline or {}).get("stages", {})
+    for stage, st in result["stages"].items():
+        old = base_stages.get(stage, {}).get("mean_ms")
+        print(f"{stage:<24} {st['count']:>6} {st['mean_ms']:>10.2f} {st['p95_ms']:>10.2f} "
+              f"{st['total_ms']:>10.1f}{_delta(st['mean_ms'], old)}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Benchmark OCR biển số trên bộ ảnh có nhãn")
+    ap.add_argument("--images", required=True, help="thư mục ảnh biển số đã gán nhãn")
+    ap.add_argument("--out", help="ghi kết quả JSON ra file này")
+    ap.add_argument("--compare", help="file JSON của lần chạy trước để so sánh")
+    ap.add_argument("--repeat", type=int, default=1, help="số vòng chạy lại toàn bộ bộ ảnh")
+    ap.add_argument("--warmup", type=int, default=1, help="số ảnh chạy thử trước khi đo")
+    args = ap.parse_args(argv)
+
+    result = run_benchmark(Path(args.images), repeat=args.repeat, warmup=args.warmup)
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+    print_report(result, baseline)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nĐã lưu kết quả: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
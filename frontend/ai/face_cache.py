@@ -0,0 +1,74 @@
+# frontend/ai/face_cache.py
+"""
+Cache encoding khuôn mặt tham chiếu của cư dân (ảnh residents.face_image).
+
+gate_face_capture trước đây đọc lại ảnh tham chiếu + chạy face_encodings trên nó ở MỌI
+frame (kiosk gửi 1.2s/lần). Giờ mỗi cư dân chỉ encode 1 lần:
+- key: resident_id, giá trị hợp lệ khi (đường dẫn ảnh, mtime file) không đổi
+  => admin đổi ảnh / ghi đè file là tự encode lại ở lần dùng sau
+- ảnh không có khuôn mặt cũng được cache (None) để không encode lại mỗi frame
+- LRU giới hạn max_size cư dân; encode chạy ngoài lock
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class ReferenceEncodingCache:
+    def __init__(self, encode: Callable[[str], Optional[Any]], max_size: int = 1024):
+        """`encode(path)` -> encoding (vector 128-d) hoặc None nếu không thấy khuôn mặt."""
+        self.encode = encode
+        self.max_size = max(1, int(max_size))
+
+        # resident_id -> ((path, mtime), encoding | None)
+        self._entries: "OrderedDict[str, Tuple[Tuple[str, float], Optional[Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidated": 0}
+
+    def get(self, resident_id, path: str) -> Optional[Any]:
+        """Encoding tham chiếu của cư dân; file không tồn tại / không có mặt -> None."""
+        rid = str(resident_id)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self.invalidate(rid)
+            return None
+        key = (str(path), mtime)
+
+        with self._lock:
+            entry = self._entries.get(rid)
+            if entry is not None:
+                if entry[0] == key:
+                    self._entries.move_to_end(rid)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                self._stats["invalidated"] += 1
+            self._stats["misses"] += 1
+
+        encoding = self.encode(str(path))
+
+        with self._lock:
+            self._entries[rid] = (key, encoding)
+            self._entries.move_to_end(rid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return encoding
+
+    def invalidate(self, resident_id=None) -> None:
+        """Xoá 1 cư dân (hoặc toàn bộ nếu resident_id=None)."""
+        with self._lock:
+            if resident_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(resident_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+            data["size"] = len(self._entries)
+        total = data["hits"] + data["misses"]
+        data["hit_rate"] = round(data["hits"] / total, 4) if total else 0.0
+        return data
@@ -0,0 +1,89 @@
+# frontend/ai/face_detect.py
+"""
+Detect khuôn mặt trên ảnh thu nhỏ, encode đúng 1 khuôn mặt ở độ phân giải gốc.
+
+Chi phí detector (HOG/CNN của dlib) tỉ lệ với số pixel => detect trên bản thu nhỏ
+(cạnh dài = max_side của profile) rẻ hơn ~1/scale^2 lần. Box được map về ảnh gốc rồi
+face_encodings chỉ chạy landmark + model 128-d trên vùng mặt đó ở full resolution.
+
+Profile (FACE_DETECT_PROFILE):
+- fast:      HOG, detect ở 320px
+- balanced:  HOG, detect ở 480px (mặc định)
+- accurate:  CNN, detect ở 640px (chậm trên CPU, nên dùng khi có GPU)
+Ghi đè riêng bằng FACE_DETECT_MODEL (hog|cnn) / FACE_DETECT_MAX_SIDE.
+
+Frame có nhiều mặt: mặt nhỏ hơn FACE_MIN_AREA_RATIO lần mặt lớn nhất coi là người
+đi ngang phía sau và bỏ qua; còn >= 2 mặt lớn -> bỏ frame (không biết ai đang xác thực).
+Ảnh hồ sơ / đăng ký (add_resident_face, face_enroll, ảnh tham chiếu trong app) dùng cùng
+quy tắc: >= 2 mặt lớn -> từ chối, không đoán mặt lớn nhất là cư dân.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from frontend.ai.image_utils import css_box_to_original, resize_to_max_side
+
+FACE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "fast": {"model": "hog", "max_side": 320},
+    "balanced": {"model": "hog", "max_side": 480},
+    "accurate": {"model": "cnn", "max_side": 640},
+}
+
+FACE_DETECT_PROFILE = os.getenv("FACE_DETECT_PROFILE", "balanced").strip().lower()
+FACE_MIN_AREA_RATIO = float(os.getenv("FACE_MIN_AREA_RATIO", 0.25))
+
+# trạng thái trả về của encode_single_face
+FACE_OK = "ok"
+FACE_NONE = "no_face"
+FACE_MULTIPLE = "multiple_faces"
+
+
+def detect_settings(profile: Optional[str] = None) -> Dict[str, Any]:
+    name = (profile or FACE_DETECT_PROFILE).strip().lower()
+    if name not in FACE_PROFILES:
+        print(f"[WARN] FACE_DETECT_PROFILE={name!r} không hợp lệ, dùng balanced.")
+        name = "balanced"
+    settings = dict(FACE_PROFILES[name])
+    settings["model"] = os.getenv("FACE_DETECT_MODEL", settings["model"]).strip().lower()
+    settings["max_side"] = int(os.getenv("FACE_DETECT_MAX_SIDE", settings["max_side"]))
+    settings["profile"] = name
+    return settings
+
+
+def _area(box) -> int:
+    top, right, bottom, left = box
+    return max(0, bottom - top) * max(0, right - left)
+
+
+def encode_single_face(
+    rgb_image,
+    profile: Optional[str] = None,
+    allow_multiple: bool = False,
+) -> Tuple[Optional[Any], str]:
+    """
+    Ảnh RGB (độ phân giải gốc) -> (encoding 128-d | None, trạng thái).
+    allow_multiple=True: nhiều mặt lớn vẫn encode mặt lớn nhất.
+    """
+    import face_recognition  # type: ignore
+
+    if rgb_image is None:
+        return None, FACE_NONE
+
+    settings = detect_settings(profile)
+    small, scale = resize_to_max_side(rgb_image, settings["max_side"])
+    boxes = face_recognition.face_locations(small, model=settings["model"])
+    if not boxes:
+        return None, FACE_NONE
+
+    boxes.sort(key=_area, reverse=True)
+    largest = boxes[0]
+    big = [b for b in boxes if _area(b) >= _area(largest) * FACE_MIN_AREA_RATIO]
+    if len(big) > 1 and not allow_multiple:
+        return None, FACE_MULTIPLE
+
+    box = css_box_to_original(largest, scale, rgb_image.shape)
+    encs = face_recognition.face_encodings(rgb_image, known_face_locations=[box])
+    if not encs:
+        return None, FACE_NONE
+    return encs[0], FACE_OK
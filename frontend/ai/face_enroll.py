@@ -0,0 +1,155 @@
+# frontend/ai/face_enroll.py
+"""
+Đăng ký khuôn mặt hàng loạt vào kho encoding (face_store) – dùng khi nhận 1 toà nhà mới.
+
+Chạy (từ thư mục gốc repo):
+    python -m frontend.ai.face_enroll --from-db                 # mọi residents.face_image
+    python -m frontend.ai.face_enroll --dir photos/residents    # <resident_id>[_xx].jpg
+    python -m frontend.ai.face_enroll --from-db --workers 8 --report enroll_report.json
+
+- Encode song song trong ProcessPoolExecutor (dlib chạy 1 luồng / tiến trình)
+- Ảnh không có mặt / nhiều mặt / không đọc được được liệt kê trong báo cáo, không ghi vào kho
+  (cùng quy tắc với add_resident_face)
+- Thư mục ảnh (--dir) phải khác FACE_DATA_DIR: đó là chỗ kho encoding tự quản lý
+- Kết quả hợp lệ ghi vào kho trong 1 lần (FaceEmbeddingStore.add_many), không ghi lại
+  cả file cho từng cư dân như add_resident_face
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from frontend.ai.face_detect import FACE_OK, encode_single_face
+from frontend.ai.image_utils import FACE_MAX_SIDE, load_image_rgb
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+
+Job = Tuple[str, str]  # (resident_id, đường dẫn ảnh)
+
+
+def jobs_from_db() -> List[Job]:
+    """(resident_id, đường dẫn tuyệt đối) của mọi cư dân có face_image."""
+    from backend.db import query_all
+
+    rows = query_all("SELECT id, face_image FROM residents WHERE face_image IS NOT NULL AND face_image <> ''")
+    jobs = []
+    for r in rows:
+        rel = (r["face_image"] or "").replace("\\", "/").lstrip("/")
+        jobs.append((str(r["id"]), str(STATIC_DIR / rel)))
+    return jobs
+
+
+def jobs_from_dir(photos_dir: Path) -> List[Job]:
+    """Tên file (phần trước dấu "_" đầu tiên) là resident_id: 12.jpg, 12_front.png."""
+    return [
+        (p.stem.split("_", 1)[0], str(p))
+        for p in sorted(photos_dir.iterdir())
+        if p.suffix.lower() in IMAGE_EXTS
+    ]
+
+
+def _encode_job(job: Job) -> Tuple[str, str, Optional[List[float]], str]:
+    """Chạy trong tiến trình con: (resident_id, path, encoding | None, trạng thái)."""
+    rid, path = job
+    if not os.path.exists(path):
+        return rid, path, None, "missing_file"
+    image, _ = load_image_rgb(path, FACE_MAX_SIDE)
+    if image is None:
+        return rid, path, None, "unreadable"
+    try:
+        # ảnh hồ sơ phải có đúng 1 mặt lớn, giống add_resident_face
+        encoding, status = encode_single_face(image)
+    except Exception as e:
+        return rid, path, None, f"error: {e}"
+    if status != FACE_OK:
+        return rid, path, None, status
+    return rid, path, [float(x) for x in encoding], FACE_OK
+
+
+def enroll(jobs: List[Job], workers: Optional[int] = None, dry_run: bool = False) -> Dict[str, Any]:
+    from frontend.ai.face_recognition import _ensure_store, _known
+
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+
+    encoded: Dict[str, Tuple[List[float], str]] = {}
+    problems: List[Dict[str, str]] = []
+    if workers <= 1:
+        results = map(_encode_job, jobs)
+        for rid, path, enc, status in results:
+            _collect(rid, path, enc, status, encoded, problems)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            chunk = max(1, len(jobs) // (workers * 4))
+            for rid, path, enc, status in ex.map(_encode_job, jobs, chunksize=chunk):
+                _collect(rid, path, enc, status, encoded, problems)
+
+    written = 0
+    if encoded and not dry_run:
+        store = _ensure_store()
+        if store is None:
+            raise SystemExit("Thiếu face_recognition/numpy -> không ghi được kho encoding.")
+        written = store.add_many(
+            (rid, enc, {"source": path, "enrolled_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+            for rid, (enc, path) in encoded.items()
+        )
+        _known.invalidate()
+
+    return {
+        "photos": len(jobs),
+        "enrolled": written,
+        "problems": problems,
+        "workers": workers,
+        "seconds": round(time.perf_counter() - t0, 2),
+    }
+
+
+def _collect(rid, path, enc, status, encoded, problems) -> None:
+    if enc is None:
+        problems.append({"resident_id": rid, "path": path, "status": status})
+    elif rid in encoded:
+        # 1 cư dân nhiều ảnh: giữ ảnh đầu tiên, báo trùng
+        problems.append({"resident_id": rid, "path": path, "status": "duplicate_resident"})
+    else:
+        encoded[rid] = (enc, path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Đăng ký khuôn mặt cư dân hàng loạt")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--from-db", action="store_true", help="lấy ảnh từ residents.face_image")
+    src.add_argument("--dir", help="thư mục ảnh, tên file = resident_id")
+    ap.add_argument("--workers", type=int, default=None, help="số tiến trình encode (mặc định = số CPU)")
+    ap.add_argument("--dry-run", action="store_true", help="chỉ encode + báo cáo, không ghi kho")
+    ap.add_argument("--report", help="ghi báo cáo JSON ra file này")
+    args = ap.parse_args(argv)
+
+    if args.dir:
+        from frontend.ai.face_recognition import FACE_DATA_DIR
+        if Path(args.dir).resolve() == Path(FACE_DATA_DIR).resolve():
+            raise SystemExit(f"--dir trùng FACE_DATA_DIR ({FACE_DATA_DIR}) – để ảnh ở thư mục riêng.")
+
+    jobs = jobs_from_db() if args.from_db else jobs_from_dir(Path(args.dir))
+    if not jobs:
+        raise SystemExit("Không có ảnh nào để đăng ký.")
+
+    result = enroll(jobs, workers=args.workers, dry_run=args.dry_run)
+
+    print(f"Ảnh: {result['photos']}   Đã đăng ký: {result['enrolled']}   "
+          f"Lỗi: {len(result['problems'])}   ({result['seconds']}s, {result['workers']} tiến trình)")
+    for p in result["problems"]:
+        print(f"  [{p['status']}] resident {p['resident_id']}: {p['path']}")
+
+    if args.report:
+        Path(args.report).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nĐã lưu báo cáo: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# frontend/ai/face_index.py
+"""
+Index ANN (IVF, thuần NumPy) cho nhận diện khuôn mặt 1:N khi số cư dân rất lớn.
+
+- Gom encoding (128-d) thành `nlist` cụm bằng k-means; mỗi cụm giữ danh sách id + vector
+- Tìm kiếm: chọn `nprobe` cụm có tâm gần nhất, rồi tính khoảng cách CHÍNH XÁC tới mọi
+  ứng viên trong các cụm đó (re-rank) => khoảng cách trả về giống hệt quét tuyến tính,
+  ngưỡng `tolerance` giữ nguyên ý nghĩa; chỉ có thể bỏ sót khi mặt đúng nằm ở cụm không được dò
+- Thêm / xoá từng cư dân không cần build lại (gán vào cụm gần nhất); build lại khi
+  số phần tử tăng gấp đôi so với lúc build (tâm cụm đã lệch)
+- Lưu cạnh kho FaceEmbeddingStore trong FACE_DATA_DIR (face_embeddings.index.pickle,
+  xem index_path_for) kèm FaceEmbeddingStore.signature() (mtime_ns, size của manifest,
+  size của log) lúc build để biết index còn khớp với kho hay không
+"""
+from __future__ import annotations
+
+import os
+import pickle
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+FACE_ANN_ENABLED = os.getenv("FACE_ANN_ENABLED", "1") == "1"
+# dưới ngưỡng này quét tuyến tính (vector hoá) đã đủ nhanh
+FACE_ANN_MIN_SIZE = int(os.getenv("FACE_ANN_MIN_SIZE", 5000))
+FACE_ANN_NPROBE = int(os.getenv("FACE_ANN_NPROBE", 8))
+
+INDEX_VERSION = 1
+
+
+def index_path_for(base_path: str) -> str:
+    """File index của kho FaceEmbeddingStore có base_path (vd. data/faces/face_embeddings)."""
+    root, _ = os.path.splitext(base_path)
+    return root + ".index.pickle"
+
+
+def _kmeans(matrix, nlist: int, iters: int = 10, seed: int = 0):
+    """Lloyd k-means đơn giản; trả về tâm cụm (nlist, d)."""
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    centroids = matrix[rng.choice(n, size=nlist, replace=False)].copy()
+    sq = (matrix * matrix).sum(axis=1)
+    for _ in range(iters):
+        d2 = sq[:, None] - 2.0 * (matrix @ centroids.T) + (centroids * centroids).sum(axis=1)[None, :]
+        assign = d2.argmin(axis=1)
+        for c in range(nlist):
+            members = matrix[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+            else:
+                # cụm rỗng -> lấy ngẫu nhiên 1 điểm làm tâm mới
+                centroids[c] = matrix[rng.integers(n)]
+    return centroids
+
+
+class IVFFaceIndex:
+    def __init__(self, nprobe: int = FACE_ANN_NPROBE):
+        self.nprobe = max(1, int(nprobe))
+        self.centroids = np.zeros((0, 128), dtype=np.float64)
+        self.lists: List[Dict[str, Any]] = []     # [{"ids": [...], "vectors": ndarray (m, d)}]
+        self.where: Dict[Any, int] = {}            # resident_id -> cụm
+        self.built_size = 0
+        self.signature: Optional[Tuple[int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.where)
+
+    # ---------- build ----------
+    def build(self, ids, matrix) -> None:
+        matrix = np.asarray(matrix, dtype=np.float64)
+        n = len(ids)
+        nlist = max(1, min(n, int(np.sqrt(n))))
+        self.centroids = _kmeans(matrix, nlist) if n else np.zeros((0, matrix.shape[1]), dtype=np.float64)
+        self.lists = [{"ids": [], "vectors": np.zeros((0, matrix.shape[1]), dtype=np.float64)} for _ in range(nlist)]
+        self.where = {}
+
+        if n:
+            assign = self._nearest_lists(matrix, 1)[:, 0]
+            for c in range(nlist):
+                sel = np.nonzero(assign == c)[0]
+                self.lists[c]["ids"] = [ids[i] for i in sel]
+                self.lists[c]["vectors"] = matrix[sel]
+                for i in sel:
+                    self.where[ids[i]] = c
+        self.built_size = n
+
+    def needs_rebuild(self) -> bool:
+        return not self.lists or len(self) > 2 * max(1, self.built_size)
+
+    def _nearest_lists(self, queries, nprobe: int):
+        q = np.atleast_2d(queries)
+        d2 = (q * q).sum(axis=1)[:, None] - 2.0 * (q @ self.centroids.T) + \
+            (self.centroids * self.centroids).sum(axis=1)[None, :]
+        nprobe = min(nprobe, len(self.centroids))
+        if nprobe >= len(self.centroids):
+            return np.argsort(d2, axis=1)
+        idx = np.argpartition(d2, nprobe - 1, axis=1)[:, :nprobe]
+        return np.take_along_axis(idx, np.argsort(np.take_along_axis(d2, idx, axis=1), axis=1), axis=1)
+
+    # ---------- cập nhật từng phần tử ----------
+    def add(self, rid, vector) -> None:
+        v = np.asarray(vector, dtype=np.float64).reshape(1, -1)
+        self.remove(rid)
+        if not self.lists:
+            self.centroids = v.copy()
+            self.lists = [{"ids": [], "vectors": np.zeros((0, v.shape[1]), dtype=np.float64)}]
+        c = int(self._nearest_lists(v, 1)[0, 0])
+        lst = self.lists[c]
+        lst["ids"].append(rid)
+        lst["vectors"] = np.vstack([lst["vectors"], v])
+        self.where[rid] = c
+
+    def remove(self, rid) -> bool:
+        c = self.where.pop(rid, None)
+        if c is None:
+            return False
+        lst = self.lists[c]
+        i = lst["ids"].index(rid)
+        del lst["ids"][i]
+        lst["vectors"] = np.delete(lst["vectors"], i, axis=0)
+        return True
+
+    # ---------- tìm kiếm ----------
+    def search(self, vector, k: int = 5, nprobe: Optional[int] = None) -> List[Tuple[Any, float]]:
+        """k phần tử gần nhất trong các cụm được dò; khoảng cách là khoảng cách Euclid chính xác."""
+        if not self.where:
+            return []
+        q = np.asarray(vector, dtype=np.float64)
+        cand_ids: List[Any] = []
+        cand_vecs = []
+        for c in self._nearest_lists(q, nprobe or self.nprobe)[0]:
+            lst = self.lists[int(c)]
+            if lst["ids"]:
+                cand_ids.extend(lst["ids"])
+                cand_vecs.append(lst["vectors"])
+        if not cand_ids:
+            return []
+
+        # re-rank chính xác trên các ứng viên
+        dist = np.linalg.norm(np.vstack(cand_vecs) - q, axis=1)
+        k = min(max(1, int(k)), len(cand_ids))
+        idx = np.argpartition(dist, k - 1)[:k]
+        idx = idx[np.argsort(dist[idx])]
+        return [(cand_ids[i], float(dist[i])) for i in idx]
+
+    # ---------- lưu / nạp ----------
+    def save(self, path: str) -> None:
+        state = {
+            "version": INDEX_VERSION,
+            "centroids": self.centroids,
+            "lists": self.lists,
+            "built_size": self.built_size,
+            "signature": self.signature,
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = FACE_ANN_NPROBE) -> Optional["IVFFaceIndex"]:
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(state, dict) or state.get("version") != INDEX_VERSION:
+            return None
+
+        index = cls(nprobe=nprobe)
+        index.centroids = state["centroids"]
+        index.lists = state["lists"]
+        index.built_size = state["built_size"]
+        index.signature = state["signature"]
+        index.where = {rid: c for c, lst in enumerate(index.lists) for rid in lst["ids"]}
+        return index
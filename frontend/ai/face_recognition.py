@@ -2,24 +2,57 @@
 
 import os
 import pickle
-from typing import Optional, Dict, Any, List
+import threading
+from typing import Optional, Dict, Any, List, Tuple
 
 try:
     import face_recognition
     import cv2
+    import numpy as np
+    from frontend.ai.face_index import (
+        FACE_ANN_ENABLED, FACE_ANN_MIN_SIZE, IVFFaceIndex, index_path_for,
+    )
+    from frontend.ai.face_store import FaceEmbeddingStore
 except ImportError:
     face_recognition = None
     cv2 = None
+    np = None
 
+from frontend.ai.image_utils import FACE_MAX_SIDE, load_image_rgb, resize_to_max_side
+from frontend.ai.face_detect import FACE_MULTIPLE, FACE_OK, encode_single_face
 
+
+# định dạng cũ: chỉ còn dùng để chuyển sang kho .npy, hoặc khi chạy giả lập (thiếu thư viện)
 ENCODINGS_FILE = os.path.join(os.path.dirname(__file__), "face_encodings.pickle")
+# kho encoding memory-mapped + face index, xem face_store.py (dữ liệu chạy, không commit)
+FACE_DATA_DIR = os.getenv(
+    "FACE_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "faces"),
+)
+STORE_BASE = os.path.join(FACE_DATA_DIR, "face_embeddings")
+
+_store = FaceEmbeddingStore(STORE_BASE) if face_recognition is not None else None
+
+# số dòng ma trận xử lý mỗi lượt khi tính khoảng cách (giới hạn bộ nhớ tạm với float16)
+_DIST_CHUNK = 65536
+
+
+def _ensure_store():
+    """Kho encoding; lần đầu tự chuyển dữ liệu từ face_encodings.pickle nếu có."""
+    if _store is not None and not _store.exists():
+        _store.migrate_from_pickle(ENCODINGS_FILE)
+    return _store
 
 
 def load_known_faces() -> Dict[str, Any]:
     """
-    Load file lưu embeddings khuôn mặt cư dân.
+    Load embeddings khuôn mặt cư dân.
     Format: { resident_id: { 'encoding': [...], 'meta': {...} } }
     """
+    store = _ensure_store()
+    if store is not None:
+        return store.to_dict()
+
     if not os.path.exists(ENCODINGS_FILE):
         return {}
 
@@ -29,8 +62,141 @@ def load_known_faces() -> Dict[str, Any]:
 
 
 def save_known_faces(data: Dict[str, Any]) -> None:
-    with open(ENCODINGS_FILE, "wb") as f:
-        pickle.dump(data, f)
+    """Ghi lại toàn bộ (compact kho). Thêm / xoá 1 cư dân nên dùng add_resident_face / remove_resident_face."""
+    store = _ensure_store()
+    if store is not None:
+        store.replace_all(data)
+    else:
+        with open(ENCODINGS_FILE, "wb") as f:
+            pickle.dump(data, f)
+    _known.invalidate()
+
+
+class KnownFaceMatrix:
+    """
+    Toàn bộ encoding đã biết dưới dạng ma trận NumPy (N x 128) + mảng id song song.
+    - Ma trận chính mmap từ kho .npy (mọi worker chung page cache), log mới thêm nằm trong RAM
+    - Chỉ nạp lại khi chữ ký kho đổi, không phải mỗi frame
+    - Khoảng cách tới mọi cư dân tính 1 lần (vector hoá): |a - b|^2 = |a|^2 - 2ab + |b|^2
+    - Từ FACE_ANN_MIN_SIZE cư dân trở lên: dò qua index IVF (face_index.py), lưu cạnh kho
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.index_path = index_path_for(store.base_path) if store is not None else None
+        self._sig = None
+        self._view = None
+        self.ids = None         # np.ndarray[object] (N_base + N_delta,)
+        self._sq_norms = None
+        self._dead = None       # chỉ số dòng base đã bị xoá / thay
+        self._index = None      # IVFFaceIndex | None
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        self._sig = None
+
+    @staticmethod
+    def _chunks(matrix):
+        for start in range(0, len(matrix), _DIST_CHUNK):
+            yield np.asarray(matrix[start:start + _DIST_CHUNK], dtype=np.float32)
+
+    def _reload_if_needed(self) -> None:
+        _ensure_store()
+        sig = self.store.signature()
+        if sig == self._sig and self._view is not None:
+            return
+
+        view = self.store.load()
+        sq = [(m * m).sum(axis=1) for m in self._chunks(view.base)]
+        sq.append((view.delta.astype(np.float32) ** 2).sum(axis=1))
+
+        self._view = view
+        ids = np.empty(len(view.base_ids) + len(view.delta_ids), dtype=object)
+        ids[:] = list(view.base_ids) + list(view.delta_ids)
+        self.ids = ids
+        self._sq_norms = np.concatenate(sq)
+        self._dead = np.nonzero(~view.base_alive)[0]
+        self._sig = sig
+        self._sync_index(sig)
+
+    def _sync_index(self, sig) -> None:
+        """Dùng index trong RAM / trên đĩa nếu còn khớp kho encoding, không thì build lại."""
+        if not FACE_ANN_ENABLED or len(self._view) < FACE_ANN_MIN_SIZE:
+            self._index = None
+            return
+
+        index = self._index
+        if index is None or index.signature != sig:
+            index = IVFFaceIndex.load(self.index_path)
+        if index is not None and index.signature == sig and not index.needs_rebuild():
+            self._index = index
+            return
+
+        items = list(self._view.items())
+        index = IVFFaceIndex()
+        index.build([rid for rid, _ in items], np.asarray([enc for _, enc in items], dtype=np.float64))
+        index.signature = sig
+        self._index = index
+        try:
+            index.save(self.index_path)
+        except OSError as e:
+            print("[WARN] Không lưu được face index:", e)
+
+    def update_index(self, resident_id, encoding=None) -> None:
+        """
+        Cập nhật index sau khi kho vừa được ghi: thêm/thay (encoding != None)
+        hoặc xoá (encoding = None) 1 cư dân, không build lại toàn bộ.
+        """
+        with self._lock:
+            index = self._index
+            if index is None:
+                return
+            if encoding is None:
+                index.remove(resident_id)
+            else:
+                index.add(resident_id, encoding)
+            index.signature = self.store.signature()
+            try:
+                index.save(self.index_path)
+            except OSError as e:
+                print("[WARN] Không lưu được face index:", e)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._reload_if_needed()
+            return len(self._view)
+
+    def distances(self, encoding) -> Tuple[Any, Any]:
+        """(ids, khoảng cách Euclid từ `encoding` tới mọi encoding đã biết; dòng đã xoá = inf)."""
+        with self._lock:
+            self._reload_if_needed()
+            view, ids, sq, dead = self._view, self.ids, self._sq_norms, self._dead
+        e = np.asarray(encoding, dtype=np.float32)
+        dots = [m @ e for m in self._chunks(view.base)]
+        dots.append(view.delta.astype(np.float32) @ e)
+        d2 = sq - 2.0 * np.concatenate(dots) + float(e @ e)
+        dist = np.sqrt(np.maximum(d2, 0.0))
+        dist[dead] = np.inf
+        return ids, dist
+
+    def top_k(self, encoding, k: int = 5) -> List[Tuple[str, float]]:
+        """k cư dân gần nhất: [(resident_id, distance), ...] tăng dần theo khoảng cách."""
+        with self._lock:
+            self._reload_if_needed()
+            index = self._index
+        if index is not None:
+            return index.search(encoding, k)
+
+        ids, dist = self.distances(encoding)
+        if len(ids) == 0:
+            return []
+        k = min(max(1, int(k)), len(ids))
+        idx = np.argpartition(dist, k - 1)[:k]
+        idx = idx[np.argsort(dist[idx])]
+        return [(ids[i], float(dist[i])) for i in idx if np.isfinite(dist[i])]
+
+
+_known = KnownFaceMatrix(_store)
 
 
 def add_resident_face(resident_id: str, image_path: str, meta: Optional[Dict[str, Any]] = None) -> bool:
@@ -44,48 +210,70 @@ def add_resident_face(resident_id: str, image_path: str, meta: Optional[Dict[str
         save_known_faces(data)
         return True
 
-    image = face_recognition.load_image_file(image_path)
-    encodings = face_recognition.face_encodings(image)
-    if not encodings:
+    image, _ = load_image_rgb(image_path, FACE_MAX_SIDE)
+    if image is None:
+        print("[ERROR] Không đọc được ảnh:", image_path)
+        return False
+    # đúng 1 mặt lớn, giống face_enroll: ảnh 2 người không đoán ai là cư dân
+    encoding, status = encode_single_face(image)
+    if status == FACE_MULTIPLE:
+        print("[ERROR] Ảnh có nhiều khuôn mặt, cần ảnh chỉ có cư dân:", image_path)
+        return False
+    if encoding is None:
         print("[ERROR] Không tìm thấy khuôn mặt trong ảnh.")
         return False
 
-    encoding = encodings[0]
+    # ghi thêm 1 dòng vào log của kho, không ghi lại cả file
+    _ensure_store().add(resident_id, encoding, meta)
+    _known.update_index(resident_id, encoding)
+    return True
+
+
+def remove_resident_face(resident_id: str) -> bool:
+    """Xoá encoding của cư dân (VD khi xoá cư dân). Không có -> False."""
+    if face_recognition is None:
+        data = load_known_faces()
+        if resident_id not in data:
+            return False
+        del data[resident_id]
+        save_known_faces(data)
+        return True
 
-    data = load_known_faces()
-    data[resident_id] = {"encoding": encoding, "meta": meta or {}}
-    save_known_faces(data)
+    store = _ensure_store()
+    if resident_id not in store.load().meta:
+        return False
+    store.delete(resident_id)
+    _known.update_index(resident_id, None)
     return True
 
 
+def identify_resident_candidates(frame, k: int = 5) -> List[Tuple[str, float]]:
+    """
+    Top-k cư dân gần nhất với khuôn mặt trong frame BGR:
+        [(resident_id, distance), ...] tăng dần theo khoảng cách.
+    Frame không có mặt hoặc có nhiều mặt -> [] (xem face_detect.encode_single_face).
+    """
+    if face_recognition is None or len(_known) == 0:
+        return []
+
+    frame, _ = resize_to_max_side(frame, FACE_MAX_SIDE)
+    rgb_frame = np.ascontiguousarray(frame[:, :, ::-1])  # BGR -> RGB
+    encoding, status = encode_single_face(rgb_frame)
+    if status != FACE_OK:
+        return []
+    return _known.top_k(encoding, k)
+
+
 def identify_resident_from_frame(frame, tolerance: float = 0.5) -> Optional[str]:
     """
     Nhận diện cư dân từ frame webcam.
-    Trả về resident_id hoặc None.
+    Trả về resident_id gần nhất (khoảng cách <= tolerance) hoặc None.
     """
     if face_recognition is None:
         print("[WARN] face_recognition chưa cài → trả giả lập resident_id='1'")
         return "1"
 
-    known = load_known_faces()
-    if not known:
-        return None
-
-    known_ids: List[str] = []
-    known_encodings = []
-
-    for rid, info in known.items():
-        known_ids.append(rid)
-        known_encodings.append(info["encoding"])
-
-    rgb_frame = frame[:, :, ::-1]  # BGR -> RGB
-    boxes = face_recognition.face_locations(rgb_frame)
-    encodings = face_recognition.face_encodings(rgb_frame, boxes)
-
-    for encoding in encodings:
-        matches = face_recognition.compare_faces(known_encodings, encoding, tolerance=tolerance)
-        if True in matches:
-            idx = matches.index(True)
-            return known_ids[idx]
-
+    candidates = identify_resident_candidates(frame, k=1)
+    if candidates and candidates[0][1] <= tolerance:
+        return candidates[0][0]
     return None
@@ -0,0 +1,136 @@
+# frontend/ai/face_session.py
+"""
+Trạng thái xác thực khuôn mặt theo từng lượt xe ra: key = (resident_id, biển số).
+
+Kiosk gửi frame mỗi 1.2s; trước đây mỗi frame được xử lý độc lập. Giờ mỗi lượt:
+- cộng dồn khoảng cách khuôn mặt qua các frame
+- quyết định:
+    verified: 1 frame có khoảng cách <= threshold (như trước)
+    rejected: đủ max_frames frame mà không khớp, hoặc trung bình khoảng cách từ
+              3 frame trở lên > reject_mean (rõ ràng người khác) -> yêu cầu mã 6 số
+- đã rejected thì frame sau trả kết quả luôn, không decode/encode nữa
+- verified: lượt chuyển sang "chờ ghi DB" (frame đến trong lúc này bị bỏ - busy);
+  app ghi log ra xong thì close() lượt, ghi lỗi cũng close() để frame sau xác thực lại.
+  Không giữ trạng thái verified -> lần ra sau của cùng cư dân / biển số vẫn phải xác thực
+- đang xử lý 1 frame của lượt thì frame mới đến bị bỏ (busy)
+- trạng thái tự hết hạn sau ttl giây kể từ frame cuối
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+FACE_PROCESS = "process"    # begin(): frame này cần được xử lý
+FACE_BUSY = "busy"          # begin(): đang xử lý frame khác của cùng lượt
+FACE_PENDING = "pending"    # finish(): chưa đủ dữ liệu để quyết định
+FACE_VERIFIED = "verified"
+FACE_REJECTED = "rejected"
+_FACE_COMMITTING = "committing"  # đã verified, đang chờ app ghi DB rồi close()
+
+SessionKey = Tuple[str, str]
+
+
+class FaceVerifySessions:
+    def __init__(
+        self,
+        threshold: float = 0.60,
+        max_frames: int = 5,
+        reject_mean: float = 0.75,
+        ttl: float = 60.0,
+        max_sessions: int = 256,
+    ):
+        self.threshold = float(threshold)
+        self.max_frames = max(1, int(max_frames))
+        self.reject_mean = float(reject_mean)
+        self.ttl = float(ttl)
+        self.max_sessions = int(max_sessions)
+
+        self._sessions: Dict[SessionKey, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"frames": 0, "skipped": 0, "verified": 0, "rejected": 0}
+
+    def _purge(self, now: float) -> None:
+        for k in [k for k, s in self._sessions.items() if now - s["updated"] > self.ttl]:
+            del self._sessions[k]
+
+    def begin(self, key: SessionKey) -> str:
+        """Gọi khi có frame mới: FACE_PROCESS | FACE_BUSY | FACE_REJECTED."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            s = self._sessions.get(key)
+            if s is None:
+                if len(self._sessions) >= self.max_sessions:
+                    oldest = min(self._sessions, key=lambda k: self._sessions[k]["updated"])
+                    del self._sessions[oldest]
+                s = {"distances": [], "frames": 0, "decision": None, "in_flight": False, "updated": now}
+                self._sessions[key] = s
+
+            s["updated"] = now
+            if s["decision"] is not None or s["in_flight"]:
+                self._stats["skipped"] += 1
+                if s["decision"] == FACE_REJECTED:
+                    return FACE_REJECTED
+                return FACE_BUSY
+            s["in_flight"] = True
+            return FACE_PROCESS
+
+    def finish(self, key: SessionKey, distance: Optional[float], usable: bool = True) -> str:
+        """
+        Ghi kết quả frame vừa xử lý (distance = None: frame không có / nhiều mặt).
+        usable=False: không thể xác thực bằng khuôn mặt (thiếu ảnh tham chiếu...) -> rejected.
+        Trả về FACE_PENDING | FACE_VERIFIED | FACE_REJECTED.
+        Sau FACE_VERIFIED app phải ghi DB rồi gọi close(key) (kể cả khi ghi lỗi).
+        """
+        with self._lock:
+            s = self._sessions.get(key)
+            if s is None:
+                # hết hạn trong lúc xử lý -> coi như lượt mới
+                s = {"distances": [], "frames": 0, "decision": None, "in_flight": True}
+                self._sessions[key] = s
+            s["in_flight"] = False
+            s["updated"] = time.monotonic()
+            if s["decision"] == _FACE_COMMITTING:
+                return FACE_BUSY
+            if s["decision"] is not None:
+                return s["decision"]
+
+            self._stats["frames"] += 1
+            s["frames"] += 1
+            if distance is not None:
+                s["distances"].append(float(distance))
+
+            dists = s["distances"]
+            if not usable:
+                s["decision"] = FACE_REJECTED
+            elif distance is not None and distance <= self.threshold:
+                s["decision"] = FACE_VERIFIED
+            elif s["frames"] >= self.max_frames or \
+                    (len(dists) >= 3 and sum(dists) / len(dists) > self.reject_mean):
+                s["decision"] = FACE_REJECTED
+
+            if s["decision"] is None:
+                return FACE_PENDING
+            self._stats[s["decision"]] += 1
+            if s["decision"] == FACE_VERIFIED:
+                s["decision"] = _FACE_COMMITTING
+                return FACE_VERIFIED
+            return s["decision"]
+
+    def progress(self, key: SessionKey) -> Tuple[int, int]:
+        """(số frame đã xử lý, max_frames) – để hiển thị cho kiosk."""
+        with self._lock:
+            s = self._sessions.get(key)
+            return (s["frames"] if s else 0), self.max_frames
+
+    def close(self, key: SessionKey) -> None:
+        """Kết thúc lượt (đã ghi log ra, hoặc ghi lỗi -> frame sau xác thực lại từ đầu)."""
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+            data["sessions"] = len(self._sessions)
+        return data
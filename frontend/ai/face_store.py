@@ -0,0 +1,320 @@
+# frontend/ai/face_store.py
+"""
+Kho encoding khuôn mặt dạng ma trận .npy memory-mapped (thay cho face_encodings.pickle).
+
+Trên đĩa (thư mục FACE_DATA_DIR, mặc định data/faces – không commit), với base = face_embeddings:
+- face_embeddings.json        manifest: thế hệ hiện tại, danh sách id + meta song song
+- face_embeddings.<gen>.npy   ma trận (N, 128) float32/float16 đã compact, mở bằng mmap
+- face_embeddings.<gen>.log   nhật ký ghi thêm (JSONL) các thay đổi sau lần compact:
+                              {"op": "add", "id", "meta", "enc": [...]} | {"op": "del", "id"}
+
+- Đọc: np.load(mmap_mode="r") => mọi worker dùng chung page cache, không unpickle
+- Thêm / xoá 1 cư dân: ghi thêm 1 dòng vào log (không ghi lại cả file)
+- Compact (log dài quá FACE_STORE_COMPACT_EVERY dòng, hoặc replace_all): ghi .npy + log
+  thế hệ mới rồi os.replace manifest => đổi thế hệ là nguyên tử, reader cũ vẫn đọc file cũ
+- Nhiều tiến trình ghi: khoá file face_embeddings.lock (fcntl / msvcrt); load() giữ khoá
+  chia sẻ trong lúc mở .npy để compact không xoá file thế hệ cũ giữa chừng
+- signature(): chỉ os.stat manifest + log, parse manifest khi manifest đổi
+
+Chuyển từ pickle cũ: tự động lần đầu mở kho, hoặc
+    python -m frontend.ai.face_store migrate
+"""
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+FACE_STORE_DTYPE = os.getenv("FACE_STORE_DTYPE", "float32").strip().lower()
+FACE_STORE_COMPACT_EVERY = int(os.getenv("FACE_STORE_COMPACT_EVERY", 256))
+
+EMBEDDING_DIM = 128
+
+
+@contextmanager
+def _file_lock(path: str, shared: bool = False):
+    """Khoá liên tiến trình: độc quyền cho thao tác ghi, shared=True cho đọc (fcntl)."""
+    try:
+        import fcntl  # type: ignore
+    except ImportError:
+        fcntl = None
+
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            import msvcrt  # type: ignore  (không có khoá chia sẻ -> độc quyền)
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FaceStoreView:
+    """
+    Ảnh chụp kho tại 1 thời điểm:
+    - base / base_ids / base_alive: ma trận mmap đã compact + mask các dòng còn hiệu lực
+    - delta / delta_ids: các encoding mới trong log (mảng nhỏ trong RAM)
+    """
+
+    def __init__(self, base, base_ids, base_alive, delta, delta_ids, meta):
+        self.base = base
+        self.base_ids = base_ids
+        self.base_alive = base_alive
+        self.delta = delta
+        self.delta_ids = delta_ids
+        self.meta = meta
+
+    def __len__(self) -> int:
+        return int(self.base_alive.sum()) + len(self.delta_ids)
+
+    def items(self) -> Iterable[Tuple[Any, Any]]:
+        """(resident_id, encoding) của mọi cư dân còn hiệu lực."""
+        for i in np.nonzero(self.base_alive)[0]:
+            yield self.base_ids[i], self.base[i]
+        for i, rid in enumerate(self.delta_ids):
+            yield rid, self.delta[i]
+
+
+class FaceEmbeddingStore:
+    def __init__(
+        self,
+        base_path: str,
+        dtype: str = FACE_STORE_DTYPE,
+        compact_every: int = FACE_STORE_COMPACT_EVERY,
+    ):
+        self.base_path = base_path
+        self.manifest_path = base_path + ".json"
+        self.lock_path = base_path + ".lock"
+        self.dtype = np.float16 if dtype == "float16" else np.float32
+        self.compact_every = max(1, int(compact_every))
+        self._lock = threading.Lock()
+        # (inode, mtime_ns, size) của manifest -> manifest đã parse, để signature() không đọc JSON mỗi frame
+        self._manifest_cache: Optional[Tuple[Tuple[int, int, int], Dict[str, Any]]] = None
+        os.makedirs(os.path.dirname(base_path) or ".", exist_ok=True)
+
+    # ---------- manifest ----------
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(os.path.dirname(self.base_path), name)
+
+    def _cached_manifest(self, st: os.stat_result) -> Dict[str, Any]:
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        cached = self._manifest_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        manifest = self._read_manifest() or {}
+        self._manifest_cache = (key, manifest)
+        return manifest
+
+    def signature(self) -> Optional[Tuple[int, int, int]]:
+        """Đổi khi kho đổi (compact hoặc ghi thêm log) -> dùng để hot-reload. Chỉ stat, không đọc file."""
+        try:
+            st = os.stat(self.manifest_path)
+        except OSError:
+            return None
+        manifest = self._cached_manifest(st)
+        try:
+            log_size = os.path.getsize(self._path(manifest.get("log", "")))
+        except OSError:
+            log_size = 0
+        return st.st_mtime_ns, st.st_size, log_size
+
+    # ---------- đọc ----------
+    def _read_log(self, manifest: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ops = []
+        try:
+            with open(self._path(manifest["log"]), "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        # dòng cuối ghi dở (tiến trình ghi bị ngắt) -> bỏ qua
+                        continue
+        except OSError:
+            pass
+        return ops
+
+    def load(self) -> FaceStoreView:
+        # khoá chia sẻ: compact (khoá độc quyền) không đổi thế hệ / xoá .npy giữa lúc đọc manifest
+        # và mmap; đã mmap xong thì file cũ có bị xoá vẫn đọc được
+        with _file_lock(self.lock_path, shared=True):
+            return self._load_locked()
+
+    def _load_locked(self) -> FaceStoreView:
+        manifest = self._read_manifest()
+        if manifest is None:
+            empty = np.zeros((0, EMBEDDING_DIM), dtype=self.dtype)
+            return FaceStoreView(empty, [], np.zeros(0, dtype=bool), empty, [], {})
+
+        base_ids = list(manifest["ids"])
+        if base_ids:
+            base = np.load(self._path(manifest["npy"]), mmap_mode="r")
+        else:
+            base = np.zeros((0, EMBEDDING_DIM), dtype=self.dtype)
+        meta = dict(zip(base_ids, manifest["meta"]))
+        alive = np.ones(len(base_ids), dtype=bool)
+        row_of = {rid: i for i, rid in enumerate(base_ids)}
+
+        delta: Dict[Any, Any] = {}
+        for op in self._read_log(manifest):
+            rid = op.get("id")
+            if rid in row_of:
+                alive[row_of[rid]] = False
+            delta.pop(rid, None)
+            meta.pop(rid, None)
+            if op.get("op") == "add":
+                delta[rid] = op["enc"]
+                meta[rid] = op.get("meta") or {}
+
+        delta_ids = list(delta)
+        delta_matrix = np.asarray([delta[r] for r in delta_ids], dtype=self.dtype).reshape(-1, EMBEDDING_DIM)
+        return FaceStoreView(base, base_ids, alive, delta_matrix, delta_ids, meta)
+
+    def to_dict(self) -> Dict[Any, Dict[str, Any]]:
+        """Dạng cũ của pickle: {resident_id: {"encoding": ndarray, "meta": {...}}}."""
+        view = self.load()
+        return {
+            rid: {"encoding": np.asarray(enc, dtype=np.float64), "meta": view.meta.get(rid) or {}}
+            for rid, enc in view.items()
+        }
+
+    # ---------- ghi ----------
+    def _append(self, ops: List[Dict[str, Any]]) -> None:
+        with self._lock, _file_lock(self.lock_path):
+            manifest = self._read_manifest()
+            if manifest is None:
+                self._write_generation({}, 0)
+                manifest = self._read_manifest()
+
+            lines = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+            log_path = self._path(manifest["log"])
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+            if len(self._read_log(manifest)) >= self.compact_every:
+                self._compact_locked(manifest)
+
+    @staticmethod
+    def _add_op(resident_id, encoding, meta) -> Dict[str, Any]:
+        enc = [round(float(x), 7) for x in np.asarray(encoding, dtype=np.float64).ravel()]
+        return {"op": "add", "id": resident_id, "meta": meta or {}, "enc": enc}
+
+    def add(self, resident_id, encoding, meta: Optional[Dict[str, Any]] = None) -> None:
+        self._append([self._add_op(resident_id, encoding, meta)])
+
+    def add_many(self, items: Iterable[Tuple[Any, Any, Optional[Dict[str, Any]]]]) -> int:
+        """Thêm nhiều cư dân [(resident_id, encoding, meta), ...] trong 1 lần ghi."""
+        ops = [self._add_op(rid, enc, meta) for rid, enc, meta in items]
+        if ops:
+            self._append(ops)
+        return len(ops)
+
+    def delete(self, resident_id) -> None:
+        self._append([{"op": "del", "id": resident_id}])
+
+    def replace_all(self, data: Dict[Any, Dict[str, Any]]) -> None:
+        """Ghi lại toàn bộ kho từ dict dạng pickle cũ (compact luôn)."""
+        with self._lock, _file_lock(self.lock_path):
+            manifest = self._read_manifest() or {}
+            self._write_generation(data, int(manifest.get("generation", 0)) + 1, manifest)
+
+    def compact(self) -> None:
+        with self._lock, _file_lock(self.lock_path):
+            manifest = self._read_manifest()
+            if manifest is not None:
+                self._compact_locked(manifest)
+
+    def _compact_locked(self, manifest: Dict[str, Any]) -> None:
+        view = self._load_locked()
+        data = {rid: {"encoding": enc, "meta": view.meta.get(rid) or {}} for rid, enc in view.items()}
+        self._write_generation(data, int(manifest.get("generation", 0)) + 1, manifest)
+
+    def _write_generation(self, data: Dict[Any, Dict[str, Any]], generation: int, old=None) -> None:
+        """Ghi .npy + log rỗng của thế hệ mới rồi đổi manifest bằng os.replace (nguyên tử)."""
+        name = os.path.basename(self.base_path)
+        npy_name = f"{name}.{generation}.npy"
+        log_name = f"{name}.{generation}.log"
+
+        ids = list(data)
+        matrix = np.asarray([data[r]["encoding"] for r in ids], dtype=self.dtype).reshape(-1, EMBEDDING_DIM)
+
+        tmp_npy = self._path(npy_name + ".tmp")
+        with open(tmp_npy, "wb") as f:
+            np.save(f, matrix)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_npy, self._path(npy_name))
+        open(self._path(log_name), "w").close()
+
+        manifest = {
+            "generation": generation,
+            "dtype": np.dtype(self.dtype).name,
+            "npy": npy_name,
+            "log": log_name,
+            "ids": ids,
+            "meta": [data[r].get("meta") or {} for r in ids],
+        }
+        tmp_manifest = self.manifest_path + ".tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_manifest, self.manifest_path)
+
+        # dọn thế hệ cũ; reader đang mmap file cũ vẫn đọc được (Windows có thể chưa xoá được)
+        if old:
+            for key in ("npy", "log"):
+                try:
+                    os.remove(self._path(old[key]))
+                except OSError:
+                    pass
+
+    # ---------- chuyển đổi từ pickle ----------
+    def migrate_from_pickle(self, pickle_path: str) -> int:
+        """Nạp face_encodings.pickle cũ vào kho (chỉ khi kho chưa có). Trả về số cư dân."""
+        if self.exists() or not os.path.exists(pickle_path):
+            return 0
+        with open(pickle_path, "rb") as f:
+            data = pickle.load(f)
+        self.replace_all(data)
+        print(f"[INFO] Đã chuyển {len(data)} encoding từ {pickle_path} sang {self.manifest_path}")
+        return len(data)
+
+
+if __name__ == "__main__":
+    from frontend.ai.face_recognition import ENCODINGS_FILE, STORE_BASE
+
+    store = FaceEmbeddingStore(STORE_BASE)
+    if len(sys.argv) == 2 and sys.argv[1] == "migrate":
+        n = store.migrate_from_pickle(ENCODINGS_FILE)
+        print(f"Đã chuyển {n} cư dân." if n else "Kho đã tồn tại hoặc không có file pickle.")
+    elif len(sys.argv) == 2 and sys.argv[1] == "compact":
+        store.compact()
+        print("Đã compact kho encoding.")
+    else:
+        print("Cách dùng: python -m frontend.ai.face_store migrate|compact")
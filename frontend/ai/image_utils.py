@@ -0,0 +1,133 @@
+# frontend/ai/image_utils.py
+"""
+Chuẩn hoá độ phân giải ảnh trước khi OCR biển số / encode khuôn mặt.
+
+Frame từ kiosk là PNG full-size (canvas.toDataURL), detect trên ảnh lớn tốn CPU
+theo số pixel mà không chính xác hơn. Các hàm ở đây:
+- giới hạn cạnh dài của ảnh làm việc (max_side), trả kèm `scale` = mới / gốc
+- map ngược box từ ảnh làm việc về ảnh gốc để crop ở full resolution
+"""
+from __future__ import annotations
+
+import os
+from typing import Optional, Tuple, Union
+
+# Cạnh dài tối đa của ảnh làm việc (0 = giữ nguyên)
+PLATE_MAX_SIDE = int(os.getenv("PLATE_MAX_SIDE", 1280))
+FACE_MAX_SIDE = int(os.getenv("FACE_MAX_SIDE", 800))
+
+Box = Tuple[int, int, int, int]  # (x, y, w, h)
+
+
+def _lazy_cv2_np():
+    try:
+        import cv2  # type: ignore
+        import numpy as np  # type: ignore
+    except Exception:
+        return None, None
+    return cv2, np
+
+
+def resize_to_max_side(img, max_side: int) -> Tuple[object, float]:
+    """
+    Thu nhỏ ảnh (giữ tỉ lệ) để cạnh dài <= max_side. Không phóng to.
+    Trả về (ảnh, scale) với scale = kích thước mới / kích thước gốc (<= 1.0).
+    """
+    if img is None or not max_side or max_side <= 0:
+        return img, 1.0
+
+    h, w = img.shape[:2]
+    longest = max(h, w)
+    if longest <= max_side:
+        return img, 1.0
+
+    cv2, _ = _lazy_cv2_np()
+    if cv2 is None:
+        return img, 1.0
+
+    scale = max_side / float(longest)
+    new_size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+    # INTER_AREA cho chất lượng tốt nhất khi thu nhỏ
+    return cv2.resize(img, new_size, interpolation=cv2.INTER_AREA), scale
+
+
+def box_to_original(box: Box, scale: float, original_shape=None) -> Box:
+    """Map box (x, y, w, h) trên ảnh đã thu nhỏ về toạ độ ảnh gốc."""
+    if scale == 1.0:
+        return box
+    x, y, w, h = box
+    inv = 1.0 / scale
+    x0, y0 = int(x * inv), int(y * inv)
+    x1, y1 = int(round((x + w) * inv)), int(round((y + h) * inv))
+    if original_shape is not None:
+        oh, ow = original_shape[:2]
+        x1, y1 = min(ow, x1), min(oh, y1)
+    return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+
+def css_box_to_original(box: Tuple[int, int, int, int], scale: float, original_shape=None) -> Tuple[int, int, int, int]:
+    """Như box_to_original nhưng cho box kiểu face_recognition (top, right, bottom, left)."""
+    top, right, bottom, left = box
+    x, y, w, h = box_to_original((left, top, right - left, bottom - top), scale, original_shape)
+    return y, x + w, y + h, x
+
+
+def decode_image(image_bytes: bytes, max_side: int = 0, rgb: bool = False) -> Tuple[Optional[object], float]:
+    """
+    Decode bytes PNG/JPG -> (ảnh BGR hoặc RGB đã giới hạn cạnh dài, scale).
+    Lỗi / thiếu OpenCV -> (None, 1.0).
+    """
+    img = decode_image_full(image_bytes, rgb=rgb)
+    if img is None:
+        return None, 1.0
+    return resize_to_max_side(img, max_side)
+
+
+def decode_image_full(image_bytes: bytes, rgb: bool = False):
+    """Decode bytes PNG/JPG ở độ phân giải gốc (BGR, hoặc RGB nếu rgb=True)."""
+    cv2, np = _lazy_cv2_np()
+    if cv2 is None or not image_bytes:
+        return None
+    try:
+        img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    except Exception:
+        return None
+    if img is None:
+        return None
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB) if rgb else img
+
+
+def load_image_rgb(source: Union[bytes, str], max_side: int = 0) -> Tuple[Optional[object], float]:
+    """
+    Bytes ảnh hoặc đường dẫn file -> (ảnh RGB numpy đã giới hạn cạnh dài, scale),
+    dùng thay face_recognition.load_image_file.
+    Thiếu OpenCV thì dùng PIL (đi kèm face_recognition). Lỗi -> (None, 1.0).
+    """
+    data = source
+    if isinstance(source, str):
+        try:
+            with open(source, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            print("[WARN] load_image_rgb:", e)
+            return None, 1.0
+
+    cv2, _ = _lazy_cv2_np()
+    if cv2 is not None:
+        return decode_image(data, max_side, rgb=True)
+
+    try:
+        import io
+        import numpy as np  # type: ignore
+        from PIL import Image  # type: ignore
+
+        im = Image.open(io.BytesIO(data)).convert("RGB")
+        w, h = im.size
+        scale = 1.0
+        if max_side and max(w, h) > max_side:
+            scale = max_side / float(max(w, h))
+            im = im.resize((max(1, int(round(w * scale))), max(1, int(round(h * scale)))))
+        return np.array(im), scale
+    except Exception as e:
+        print("[WARN] load_image_rgb:", e)
+        return None, 1.0
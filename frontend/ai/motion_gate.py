@@ -0,0 +1,100 @@
+# frontend/ai/motion_gate.py
+"""
+Chặn OCR khi cảnh trước camera không đổi (làn trống, không có xe).
+
+Mỗi kiosk giữ 1 ảnh xám rất nhỏ (64x48) của frame được OCR gần nhất ("ảnh tham chiếu").
+Frame mới chỉ được OCR khi:
+- khác ảnh tham chiếu đủ nhiều (trung bình |diff| >= threshold, thang 0..255), hoặc
+- lần OCR trước còn thấy biển số (xe đang đứng ở barie, cần tiếp tục bỏ phiếu), hoặc
+- đã bỏ qua quá `max_skip_seconds` (kiểm tra định kỳ, phòng đổi ánh sáng...)
+So với ảnh tham chiếu (không phải frame liền trước) để xe tiến chậm vẫn bị phát hiện.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple
+
+THUMB_SIZE = (64, 48)
+
+
+def _thumbnail(image_bytes: bytes):
+    """Bytes ảnh -> ảnh xám 64x48 đã blur. Không có OpenCV / lỗi -> None."""
+    try:
+        import cv2  # type: ignore
+        import numpy as np  # type: ignore
+    except Exception:
+        return None
+
+    try:
+        arr = np.frombuffer(image_bytes, dtype=np.uint8)
+        gray = cv2.imdecode(arr, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if gray is None:
+            return None
+        small = cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        # blur để nhiễu cảm biến không bị tính là chuyển động
+        return cv2.GaussianBlur(small, (5, 5), 0)
+    except Exception:
+        return None
+
+
+def _diff_score(a, b) -> float:
+    import cv2  # type: ignore
+    return float(cv2.absdiff(a, b).mean())
+
+
+class MotionGate:
+    def __init__(self, threshold: float = 6.0, max_skip_seconds: float = 10.0, max_kiosks: int = 64):
+        self.threshold = float(threshold)
+        self.max_skip_seconds = float(max_skip_seconds)
+        self.max_kiosks = int(max_kiosks)
+
+        # kiosk_id -> {"ref": thumb, "pending": thumb, "idle": bool, "last": ts}
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"checked": 0, "skipped": 0}
+
+    def should_process(self, kiosk_id: str, image_bytes: bytes) -> Tuple[bool, Optional[float]]:
+        """Trả về (có nên OCR frame này không, điểm khác biệt so với ảnh tham chiếu)."""
+        thumb = _thumbnail(image_bytes)
+        now = time.monotonic()
+
+        with self._lock:
+            self._stats["checked"] += 1
+            st = self._state.get(kiosk_id)
+            if st is None:
+                if len(self._state) >= self.max_kiosks:
+                    oldest = min(self._state, key=lambda k: self._state[k]["last"])
+                    del self._state[oldest]
+                st = {"ref": None, "pending": None, "idle": False, "last": 0.0}
+                self._state[kiosk_id] = st
+
+            st["pending"] = thumb
+            if thumb is None or st["ref"] is None or st["ref"].shape != thumb.shape:
+                return True, None
+
+            score = _diff_score(thumb, st["ref"])
+            if score >= self.threshold or not st["idle"] or now - st["last"] >= self.max_skip_seconds:
+                return True, score
+
+            self._stats["skipped"] += 1
+            return False, score
+
+    def update(self, kiosk_id: str, idle: bool) -> None:
+        """Gọi sau khi đã OCR frame: frame đó thành ảnh tham chiếu mới; idle = không thấy biển số."""
+        with self._lock:
+            st = self._state.get(kiosk_id)
+            if st is None:
+                return
+            if st["pending"] is not None:
+                st["ref"] = st["pending"]
+            st["pending"] = None
+            st["idle"] = bool(idle)
+            st["last"] = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+            data["kiosks"] = len(self._state)
+        data["threshold"] = self.threshold
+        return data
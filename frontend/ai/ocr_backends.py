@@ -0,0 +1,229 @@
+# frontend/ai/ocr_backends.py
+"""
+Backend OCR cho plate_recognition (chọn bằng biến môi trường PLATE_OCR_BACKEND).
+
+Mọi backend có cùng giao diện giống easyocr.Reader:
+    readtext(image, detail=1) -> [(box_4_điểm, text, conf), ...]
+    readtext_batched(images, detail=1, batch_size=n) -> [[...], ...]   (tuỳ chọn)
+
+- "easyocr" (mặc định): easyocr.Reader(["en"]) – kéo theo PyTorch
+- "onnx": model detect + recognize đã export ra ONNX (có thể lượng tử hoá int8),
+  chạy bằng onnxruntime trên CPU – không cần torch, khởi động nhanh, tốn ít RAM hơn
+
+Backend onnx:
+- PLATE_ONNX_REC_MODEL (bắt buộc): model nhận dạng CRNN/CTC
+  input (1, 1, 64, W) ảnh xám chuẩn hoá [-1, 1], output (1, T, C) logits, blank = 0
+- PLATE_ONNX_CHARSET: file bảng ký tự (1 dòng, ký tự thứ i <-> class i+1);
+  mặc định 0-9A-Z
+- PLATE_ONNX_DET_MODEL (tuỳ chọn): model detect kiểu CRAFT
+  input (1, 3, H, W) chuẩn hoá ImageNet, output (1, H/2, W/2, 2) với kênh 0 = text score.
+  Không có model detect -> coi cả ảnh là 1 dòng chữ (đủ dùng khi đã khoanh vùng biển số)
+
+Lượng tử hoá int8 (dynamic) 1 model:
+    python -m frontend.ai.ocr_backends quantize rec.onnx rec.int8.onnx
+"""
+from __future__ import annotations
+
+import os
+import sys
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+PLATE_OCR_BACKEND = os.getenv("PLATE_OCR_BACKEND", "easyocr").strip().lower()
+PLATE_ONNX_DET_MODEL = os.getenv("PLATE_ONNX_DET_MODEL", "")
+PLATE_ONNX_REC_MODEL = os.getenv("PLATE_ONNX_REC_MODEL", "")
+PLATE_ONNX_CHARSET = os.getenv("PLATE_ONNX_CHARSET", "")
+PLATE_ONNX_THREADS = int(os.getenv("PLATE_ONNX_THREADS", 1))
+
+DEFAULT_CHARSET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+OCRResult = Tuple[list, str, float]
+
+
+class OCRBackend(ABC):
+    """Giao diện chung; backend con cài đặt readtext (và readtext_batched nếu nhanh hơn)."""
+
+    name = "base"
+
+    @abstractmethod
+    def readtext(self, image, detail: int = 1) -> List[OCRResult]:
+        """[(box_4_điểm, text, conf), ...] (detail=0: chỉ text)."""
+
+
+class EasyOCRBackend(OCRBackend):
+    name = "easyocr"
+
+    def __init__(self, reader):
+        self.reader = reader
+        # chỉ lộ readtext_batched khi bản EasyOCR đang cài có hỗ trợ
+        if hasattr(reader, "readtext_batched"):
+            self.readtext_batched = reader.readtext_batched
+
+    def readtext(self, image, detail: int = 1) -> List[OCRResult]:
+        return self.reader.readtext(image, detail=detail)
+
+
+class OnnxOCRBackend(OCRBackend):
+    name = "onnx"
+
+    REC_HEIGHT = 64
+    REC_MAX_WIDTH = 800
+    DET_MAX_SIDE = 960
+
+    def __init__(self, rec_model: str, det_model: str = "", charset: str = DEFAULT_CHARSET, threads: int = 1):
+        import cv2  # type: ignore
+        import numpy as np  # type: ignore
+        import onnxruntime as ort  # type: ignore
+
+        self.cv2, self.np = cv2, np
+        self.charset = charset
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = max(1, int(threads))
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ["CPUExecutionProvider"]
+
+        self.rec = ort.InferenceSession(rec_model, sess_options=opts, providers=providers)
+        self.rec_input = self.rec.get_inputs()[0].name
+        self.det = None
+        if det_model:
+            self.det = ort.InferenceSession(det_model, sess_options=opts, providers=providers)
+            self.det_input = self.det.get_inputs()[0].name
+
+    # ---------- detect ----------
+    def _detect(self, img_bgr) -> List[Tuple[int, int, int, int]]:
+        """Trả về các box (x, y, w, h) chứa chữ; không có model detect -> cả ảnh."""
+        cv2, np = self.cv2, self.np
+        h, w = img_bgr.shape[:2]
+        if self.det is None:
+            return [(0, 0, w, h)]
+
+        ratio = min(1.0, self.DET_MAX_SIDE / float(max(h, w)))
+        nh = max(32, int(round(h * ratio / 32.0)) * 32)
+        nw = max(32, int(round(w * ratio / 32.0)) * 32)
+        resized = cv2.resize(img_bgr, (nw, nh), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB).astype(np.float32)
+        rgb = (rgb / 255.0 - np.array([0.485, 0.456, 0.406], dtype=np.float32)) / \
+            np.array([0.229, 0.224, 0.225], dtype=np.float32)
+        score = self.det.run(None, {self.det_input: rgb.transpose(2, 0, 1)[None]})[0][0, :, :, 0]
+
+        mask = (score > 0.4).astype(np.uint8)
+        mask = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=4)
+
+        # map score map (1/2 kích thước input) về ảnh gốc
+        sx, sy = w / float(score.shape[1]), h / float(score.shape[0])
+        boxes = []
+        for i in range(1, n):
+            x, y, bw, bh, area = stats[i]
+            if area < 10:
+                continue
+            pad = max(2, int(bh * 0.3))
+            x0, y0 = max(0, int((x - pad) * sx)), max(0, int((y - pad) * sy))
+            x1, y1 = min(w, int((x + bw + pad) * sx)), min(h, int((y + bh + pad) * sy))
+            if x1 > x0 and y1 > y0:
+                boxes.append((x0, y0, x1 - x0, y1 - y0))
+        # đọc từ trên xuống, trái sang phải như EasyOCR
+        boxes.sort(key=lambda b: (b[1], b[0]))
+        return boxes
+
+    # ---------- recognize ----------
+    def _recognize(self, crop) -> Tuple[str, float]:
+        cv2, np = self.cv2, self.np
+        gray = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        h, w = gray.shape[:2]
+        if h == 0 or w == 0:
+            return "", 0.0
+
+        nw = min(self.REC_MAX_WIDTH, max(self.REC_HEIGHT, int(round(w * self.REC_HEIGHT / float(h)))))
+        x = cv2.resize(gray, (nw, self.REC_HEIGHT), interpolation=cv2.INTER_CUBIC).astype(np.float32)
+        x = (x / 255.0 - 0.5) / 0.5
+        logits = self.rec.run(None, {self.rec_input: x[None, None]})[0][0]  # (T, C)
+
+        e = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs = e / e.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+
+        # CTC greedy: gộp ký tự lặp, bỏ blank (0)
+        chars, confs, prev = [], [], 0
+        for t, k in enumerate(best):
+            k = int(k)
+            if k != 0 and k != prev and k - 1 < len(self.charset):
+                chars.append(self.charset[k - 1])
+                confs.append(float(probs[t, k]))
+            prev = k
+
+        if not chars:
+            return "", 0.0
+        return "".join(chars), sum(confs) / len(confs)
+
+    def readtext(self, image, detail: int = 1) -> List[OCRResult]:
+        img = image
+        if img.ndim == 2:
+            img = self.cv2.cvtColor(img, self.cv2.COLOR_GRAY2BGR)
+
+        out: List[OCRResult] = []
+        for x, y, w, h in self._detect(img):
+            text, conf = self._recognize(img[y:y + h, x:x + w])
+            if text:
+                box = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+                out.append((box, text, conf) if detail else text)
+        return out
+
+
+def _load_charset(path: str) -> str:
+    if not path:
+        return DEFAULT_CHARSET
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().rstrip("\n")
+
+
+def create_backend(name: Optional[str] = None, threads: Optional[int] = None) -> Optional[OCRBackend]:
+    """
+    Tạo backend theo tên (mặc định PLATE_OCR_BACKEND). Lỗi -> None (đã in cảnh báo).
+    threads: số thread intra-op cho ONNX (mặc định PLATE_ONNX_THREADS).
+    """
+    name = (name or PLATE_OCR_BACKEND).strip().lower()
+
+    if name == "onnx":
+        if not PLATE_ONNX_REC_MODEL:
+            print("[WARN] PLATE_OCR_BACKEND=onnx nhưng chưa đặt PLATE_ONNX_REC_MODEL.")
+            return None
+        try:
+            return OnnxOCRBackend(
+                PLATE_ONNX_REC_MODEL,
+                det_model=PLATE_ONNX_DET_MODEL,
+                charset=_load_charset(PLATE_ONNX_CHARSET),
+                threads=threads or PLATE_ONNX_THREADS,
+            )
+        except Exception as e:
+            print("[WARN] Không khởi tạo được backend ONNX:", e)
+            return None
+
+    if name != "easyocr":
+        print(f"[WARN] PLATE_OCR_BACKEND={name!r} không hợp lệ, dùng easyocr.")
+
+    # EasyOCR kéo torch => import chậm, chỉ làm khi thật sự OCR
+    try:
+        import easyocr  # type: ignore
+    except Exception as e:
+        print("[WARN] Không import được EasyOCR:", e)
+        return None
+
+    # 'en' thường đủ cho biển số dạng Latin
+    return EasyOCRBackend(easyocr.Reader(["en"], gpu=False))
+
+
+def quantize_model(src: str, dst: str) -> None:
+    """Lượng tử hoá dynamic int8 (weights) cho 1 model ONNX."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType  # type: ignore
+    quantize_dynamic(src, dst, weight_type=QuantType.QInt8)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "quantize":
+        quantize_model(sys.argv[2], sys.argv[3])
+        print(f"Đã lượng tử hoá int8: {sys.argv[3]}")
+    else:
+        print("Cách dùng: python -m frontend.ai.ocr_backends quantize <in.onnx> <out.onnx>")
@@ -0,0 +1,108 @@
+# frontend/ai/ocr_cache.py
+"""
+Cache kết quả OCR biển số (LRU + TTL) đặt trước read_plate_from_image.
+
+- Key: (kiosk, SHA-1 của bytes ảnh) -> chỉ frame giống hệt của cùng kiosk trả kết quả cũ
+- Không so khớp "gần giống" (perceptual hash trên cả frame): 2 xe khác nhau đứng cùng
+  cổng cho hash gần như trùng vì nền chiếm phần lớn ảnh -> xe sau nhận biển xe trước.
+  Frame lặp lại khi làn trống đã được MotionGate chặn trước khi tới cache.
+- Giá trị cache là (plate | None, conf); kết quả None dùng TTL ngắn hơn
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Callable, Dict, Any, Tuple
+
+PlateResult = Tuple[Optional[str], float]
+_EMPTY: PlateResult = (None, 0.0)
+
+
+def frame_digest(image_bytes: bytes) -> str:
+    """SHA-1 của bytes ảnh – dùng chung cho key cache và chống bỏ phiếu trùng frame (PlateVoter)."""
+    return hashlib.sha1(image_bytes).hexdigest()
+
+
+class PlateResultCache:
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl: float = 30.0,
+        negative_ttl: float = 3.0,
+    ):
+        self.max_size = max(0, int(max_size))
+        self.ttl = float(ttl)
+        self.negative_ttl = float(negative_ttl)
+
+        # (kiosk, sha1) -> (expires_at, (plate, conf))
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, PlateResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _purge_expired(self, now: float) -> None:
+        for k in [k for k, e in self._entries.items() if e[0] <= now]:
+            del self._entries[k]
+
+    def lookup(self, key: Tuple[str, str]) -> Tuple[bool, PlateResult]:
+        """Trả về (found, (plate, conf))."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return True, entry[1]
+
+            self._stats["misses"] += 1
+            return False, _EMPTY
+
+    def store(self, key: Tuple[str, str], result: PlateResult) -> None:
+        ttl = self.ttl if result[0] else self.negative_ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(
+        self,
+        image_bytes: bytes,
+        compute: Callable[[bytes], PlateResult],
+        kiosk_id: str = "",
+        digest: Optional[str] = None,
+    ) -> PlateResult:
+        """
+        Tra cache theo (kiosk, nội dung ảnh); miss thì gọi `compute(image_bytes)` -> (plate, conf) rồi lưu lại.
+        digest: frame_digest(image_bytes) nếu caller đã tính sẵn.
+        """
+        if not self.enabled or not image_bytes:
+            return compute(image_bytes)
+
+        key = (str(kiosk_id or ""), digest or frame_digest(image_bytes))
+
+        found, result = self.lookup(key)
+        if found:
+            return result
+
+        result = compute(image_bytes)
+        self.store(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+            data["size"] = len(self._entries)
+        total = data["hits"] + data["misses"]
+        data["hit_rate"] = round(data["hits"] / total, 4) if total else 0.0
+        data["max_size"] = self.max_size
+        return data
@@ -0,0 +1,253 @@
+# frontend/ai/ocr_pool.py
+"""
+Pool tiến trình cho OCR biển số.
+
+- Mỗi worker tự load EasyOCR reader 1 lần (initializer), không share `_reader` giữa các thread
+- Hàng đợi có giới hạn: đầy thì từ chối ngay (OCRPoolBusy) thay vì dồn request
+- Mỗi job có timeout riêng: 1 frame chậm không chặn các làn khác
+- size = 0 -> chạy inline trong tiến trình Flask (có lock), giống hành vi cũ
+- Tuỳ chọn telemetry (VariantTelemetry): tiến trình cha quyết định thứ tự biến thể
+  cho từng làn, worker trả số liệu về để cộng dồn
+- Kết quả fast path (template NCC, thang điểm khác EasyOCR) chỉ được nhận khi ra biển số
+  trong `fastpath_plates` (biển đã đăng ký); không thì worker OCR đầy đủ luôn trong cùng
+  job. Kết quả nhận được báo conf = fastpath_vote_conf để không vượt strong_conf của PlateVoter
+"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Collection, Optional, Dict, Any, Tuple, Sequence
+
+
+class OCRPoolBusy(Exception):
+    """Hàng đợi OCR đã đầy."""
+
+
+def _worker_init(threads_per_worker: int, fastpath_min_conf: Optional[float] = None) -> None:
+    """
+    Chạy 1 lần trong mỗi worker:
+    - giới hạn số thread để N worker không tranh nhau CPU: torch chỉ khi backend là
+      EasyOCR (backend ONNX không import torch), ONNX dùng SessionOptions.intra_op_num_threads
+    - load sẵn OCR backend (EasyOCR reader / ONNX session)
+    """
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads_per_worker))
+
+    from frontend.ai import plate_fastpath, plate_recognition
+    from frontend.ai.ocr_backends import PLATE_OCR_BACKEND
+
+    plate_fastpath.configure(fastpath_min_conf)
+
+    if PLATE_OCR_BACKEND != "onnx":
+        try:
+            import torch  # type: ignore
+            torch.set_num_threads(threads_per_worker)
+        except Exception:
+            pass
+
+    plate_recognition._ensure_reader(threads=threads_per_worker)
+    print(f"[INFO] OCR worker pid={os.getpid()} ready")
+
+
+def _worker_warmup() -> bool:
+    from frontend.ai.plate_recognition import warmup
+    return warmup()
+
+
+def _worker_read_plate(
+    image_bytes: bytes,
+    variant_order: Optional[Sequence[str]] = None,
+    explore: bool = False,
+    fastpath_plates: Optional[Collection[str]] = None,
+) -> Dict[str, Any]:
+    from frontend.ai.plate_recognition import read_plate_detailed
+    return read_plate_detailed(image_bytes, variant_order, explore, fastpath_plates)
+
+
+class OCRPool:
+    def __init__(
+        self,
+        size: int = 2,
+        queue_size: int = 4,
+        timeout: float = 8.0,
+        threads_per_worker: int = 1,
+        telemetry=None,
+        fastpath_min_conf: Optional[float] = None,
+        fastpath_vote_conf: float = 0.5,
+    ):
+        self.size = max(0, int(size))
+        self.queue_size = max(0, int(queue_size))
+        self.timeout = float(timeout)
+        self.threads_per_worker = max(1, int(threads_per_worker))
+        self.telemetry = telemetry
+        self.fastpath_min_conf = fastpath_min_conf
+        self.fastpath_vote_conf = float(fastpath_vote_conf)
+        if self.size == 0:
+            from frontend.ai import plate_fastpath
+            plate_fastpath.configure(fastpath_min_conf)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._inline_lock = threading.Lock()
+        # số job được phép "đang chạy + đang chờ"
+        self._slots = threading.BoundedSemaphore(max(1, self.size + self.queue_size))
+
+        self._ready = False
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "fastpath_accepted": 0,
+            "fastpath_rejected": 0,
+        }
+
+    # ---------- nội bộ ----------
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # tạo lazy: không spawn worker lúc import app (reloader của Flask debug)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    initializer=_worker_init,
+                    initargs=(self.threads_per_worker, self.fastpath_min_conf),
+                )
+            return self._executor
+
+    def _reset_executor(self) -> None:
+        with self._lock:
+            ex, self._executor = self._executor, None
+        if ex is not None:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+    def _inc(self, key: str, delta: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += delta
+
+    def _on_done(self, fut) -> None:
+        self._slots.release()
+        self._inc("in_flight", -1)
+        if fut.cancelled() or fut.exception() is not None:
+            self._inc("errors")
+        else:
+            self._inc("completed")
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._inc("rejected")
+            raise OCRPoolBusy("OCR queue is full")
+
+        try:
+            fut = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._inc("submitted")
+        self._inc("in_flight")
+        fut.add_done_callback(self._on_done)
+        return fut
+
+    # ---------- API ----------
+    def submit(
+        self,
+        image_bytes: bytes,
+        variant_order: Optional[Sequence[str]] = None,
+        explore: bool = False,
+        fastpath_plates: Optional[Collection[str]] = None,
+    ):
+        """
+        Đẩy 1 frame vào pool, trả về Future (kết quả dạng read_plate_detailed).
+        Hàng đợi đầy -> OCRPoolBusy.
+        """
+        return self._submit(_worker_read_plate, image_bytes, variant_order, explore, fastpath_plates)
+
+    def warmup(self, timeout: float = 300.0) -> bool:
+        """
+        Khởi động sẵn mọi worker (load reader + 1 lần inference giả).
+        Gọi từ thread nền lúc app start; trả về True khi tất cả worker đã sẵn sàng.
+        """
+        if self.size == 0:
+            from frontend.ai.plate_recognition import warmup
+            with self._inline_lock:
+                self._ready = warmup()
+            return self._ready
+
+        try:
+            futs = [self._submit(_worker_warmup) for _ in range(self.size)]
+            self._ready = all(f.result(timeout=timeout) for f in futs)
+        except BrokenProcessPool as e:
+            # worker chết lúc load model -> tạo lại pool, lần warm-up sau dùng pool mới
+            print("[WARN] OCR pool bị hỏng lúc warm-up, tạo lại:", e)
+            self._reset_executor()
+            self._ready = False
+        return self._ready
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def read_plate_scored(
+        self,
+        image_bytes: bytes,
+        lane: str = "default",
+        fastpath_plates: Optional[Collection[str]] = None,
+    ) -> Tuple[Optional[str], float]:
+        """
+        Giống read_plate_with_confidence nhưng chạy trong pool: (plate | None, conf).
+        Timeout -> (None, 0.0) (job vẫn chạy nốt trong worker và giữ slot đến khi xong).
+        fastpath_plates: biển số (dạng chuẩn hoá) được nhận từ fast path, vd.
+        PlateIndex.canonical_plates(); None -> rỗng (mọi frame OCR đầy đủ). 1 frame = 1 job.
+        """
+        order, explore = self.telemetry.plan(lane) if self.telemetry is not None else (None, False)
+        plates = fastpath_plates if fastpath_plates is not None else frozenset()
+
+        try:
+            if self.size == 0:
+                with self._inline_lock:
+                    detail = _worker_read_plate(image_bytes, order, explore, plates)
+            else:
+                detail = self.submit(image_bytes, order, explore, plates).result(timeout=self.timeout)
+
+            if detail.get("winner") == "fastpath":
+                self._inc("fastpath_accepted")
+                detail["conf"] = self.fastpath_vote_conf
+            elif detail.get("fastpath_rejected"):
+                self._inc("fastpath_rejected")
+
+            if self.telemetry is not None:
+                self.telemetry.record(lane, detail)
+            # 1 job đọc xong = worker đã load model (kể cả khi warm-up lỗi trước đó)
+            self._ready = True
+            return detail.get("plate"), float(detail.get("conf") or 0.0)
+        except FutureTimeout:
+            self._inc("timeouts")
+            print(f"[WARN] OCR job timeout sau {self.timeout}s")
+            return None, 0.0
+        except BrokenProcessPool as e:
+            print("[WARN] OCR pool bị hỏng, tạo lại:", e)
+            self._reset_executor()
+            return None, 0.0
+
+    def read_plate(self, image_bytes: bytes, lane: str = "default") -> Optional[str]:
+        """Giống read_plate_from_image nhưng chạy trong pool."""
+        plate, _ = self.read_plate_scored(image_bytes, lane)
+        return plate
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._stats)
+        data.update({
+            "size": self.size,
+            "queue_size": self.queue_size,
+            "timeout": self.timeout,
+            "started": self._executor is not None,
+            "ready": self._ready,
+        })
+        return data
+
+    def shutdown(self) -> None:
+        self._reset_executor()
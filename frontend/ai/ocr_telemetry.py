@@ -0,0 +1,142 @@
+# frontend/ai/ocr_telemetry.py
+"""
+Thống kê từng biến thể tiền xử lý OCR (original / gray / otsu / adaptive) theo làn.
+
+- Ghi lại: số lần chạy, tổng thời gian, và trên frame thăm dò: số lần được so sánh
+  ("trials") / số lần "thắng" (conf cao nhất)
+- Cứ `explore_every` frame có 1 frame thăm dò: chạy đủ mọi biến thể, không dừng sớm,
+  biến thể cho conf cao nhất được tính thắng. Frame thường dừng ở biến thể đầu tiên đủ
+  tin cậy nên KHÔNG dùng để tính thắng (tránh tự củng cố thứ tự hiện tại)
+- plan(lane): thứ tự biến thể (thắng nhiều nhất trước, hoà thì cái nhanh hơn trước) +
+  có phải frame thăm dò không; bỏ biến thể gần như không bao giờ thắng sau khi đủ mẫu
+- Giữ tối đa `max_lanes` làn (lane = kiosk_id do client gửi), bỏ làn lâu nhất không có frame
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from frontend.ai.plate_recognition import VARIANT_NAMES
+
+
+class VariantTelemetry:
+    def __init__(
+        self,
+        names: Sequence[str] = VARIANT_NAMES,
+        min_samples: int = 30,
+        skip_below: float = 0.02,
+        explore_every: int = 20,
+        max_lanes: int = 64,
+    ):
+        self.names = list(names)
+        self.min_samples = int(min_samples)
+        self.skip_below = float(skip_below)
+        self.explore_every = max(1, int(explore_every))
+        self.max_lanes = max(1, int(max_lanes))
+
+        # lane -> {"last": ts, "frames": n, "variants": {name: {"runs", "ms", "trials", "wins"}}}
+        self._lanes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _empty_variant() -> Dict[str, Any]:
+        return {"runs": 0, "ms": 0.0, "trials": 0, "wins": 0}
+
+    def _lane(self, lane: str) -> Dict[str, Any]:
+        now = time.monotonic()
+        data = self._lanes.get(lane)
+        if data is None:
+            if len(self._lanes) >= self.max_lanes:
+                # bỏ làn lâu nhất không có frame
+                oldest = min(self._lanes, key=lambda k: self._lanes[k]["last"])
+                del self._lanes[oldest]
+            data = {
+                "last": now,
+                "frames": 0,
+                "variants": {n: self._empty_variant() for n in self.names},
+            }
+            self._lanes[lane] = data
+        data["last"] = now
+        return data
+
+    @staticmethod
+    def _win_rate(v: Dict[str, Any]) -> float:
+        # làm mượt (Laplace) để biến thể mới chưa có mẫu không bị xếp cuối ngay
+        return (v["wins"] + 1.0) / (v["trials"] + 2.0)
+
+    def _ranked(self, data: Dict[str, Any], explore: bool) -> List[str]:
+        variants = data["variants"]
+        ranked = sorted(
+            self.names,
+            key=lambda n: (
+                -self._win_rate(variants[n]),
+                variants[n]["ms"] / variants[n]["runs"] if variants[n]["runs"] else 0.0,
+            ),
+        )
+        if explore:
+            return ranked
+
+        kept = [
+            n for n in ranked
+            if variants[n]["trials"] < self.min_samples
+            or variants[n]["wins"] / float(variants[n]["trials"]) >= self.skip_below
+        ]
+        return kept or ranked[:1]
+
+    def plan(self, lane: str) -> Tuple[List[str], bool]:
+        """(thứ tự biến thể nên thử cho làn này, có phải frame thăm dò không)."""
+        with self._lock:
+            data = self._lane(lane)
+            explore = data["frames"] % self.explore_every == 0
+            return self._ranked(data, explore), explore
+
+    def order(self, lane: str) -> List[str]:
+        """Thứ tự biến thể nên thử cho làn này."""
+        return self.plan(lane)[0]
+
+    def record(self, lane: str, detail: Optional[Dict[str, Any]]) -> None:
+        """Ghi telemetry trả về từ read_plate_detailed (mỗi frame gọi đúng 1 lần)."""
+        if not detail:
+            return
+        explore = bool(detail.get("explore"))
+        with self._lock:
+            data = self._lane(lane)
+            data["frames"] += 1
+            for name, st in (detail.get("variants") or {}).items():
+                v = data["variants"].get(name)
+                if v is None:
+                    # không phải biến thể tiền xử lý (vd. "fastpath") -> không xếp hạng
+                    continue
+                # "runs" = số frame có chạy biến thể này (1 frame có thể OCR nhiều crop)
+                ran = 1 if st.get("runs") else 0
+                v["runs"] += ran
+                v["ms"] += float(st.get("ms") or 0.0)
+                if explore:
+                    v["trials"] += ran
+            winner = detail.get("winner")
+            if explore and winner in data["variants"]:
+                data["variants"][winner]["wins"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        # chỉ đọc: không cập nhật "last" của làn (xem /admin/ocr/stats không làm làn "mới")
+        with self._lock:
+            out: Dict[str, Any] = {}
+            for lane, data in self._lanes.items():
+                variants = {}
+                for name, v in data["variants"].items():
+                    runs, trials = v["runs"], v["trials"]
+                    variants[name] = {
+                        "runs": runs,
+                        "trials": trials,
+                        "wins": v["wins"],
+                        "win_rate": round(v["wins"] / float(trials), 4) if trials else 0.0,
+                        "avg_ms": round(v["ms"] / runs, 2) if runs else 0.0,
+                        "total_ms": round(v["ms"], 1),
+                    }
+                out[lane] = {
+                    "frames": data["frames"],
+                    "variants": variants,
+                    "order": self._ranked(data, False),
+                }
+        return out
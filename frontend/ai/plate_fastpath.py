@@ -0,0 +1,194 @@
+# frontend/ai/plate_fastpath.py
+"""
+Fast path nhận dạng biển số VN: tách ký tự trên crop biển số + so khớp template.
+
+Biển số VN chỉ dùng 0-9, A-Z và vài bố cục cố định (PLATE_PATTERNS), nên với crop sạch
+không cần tới model OCR tổng quát:
+1. Otsu nhị phân hoá, tách 2 dòng (biển vuông) theo histogram ngang
+2. Mỗi dòng: connected components có chiều cao/tỉ lệ giống ký tự, sắp trái -> phải
+3. Mỗi ký tự chuẩn hoá về 20x32, so NCC (vector hoá) với bộ template
+   - vị trí 0-1: chỉ số, vị trí 2: chỉ chữ, vị trí 3: chữ hoặc số, còn lại: chỉ số
+4. Chỉ nhận khi chuỗi khớp PLATE_PATTERNS và điểm ký tự kém nhất >= min_conf;
+   ngược lại trả None để plate_recognition quay về EasyOCR
+
+conf trả về là điểm NCC (thang riêng, KHÔNG cùng thang với xác suất EasyOCR): ngưỡng
+riêng Config.PLATE_FASTPATH_MIN_CONF (set qua configure()), và OCRPool chỉ nhận kết quả
+fast path khi biển số đã đăng ký, không thì OCR đầy đủ lại.
+
+Template: PLATE_TEMPLATE_DIR/<KÝ_TỰ>/*.png (ảnh ký tự cắt từ biển thật, chữ tối nền sáng).
+Thiếu thư mục -> dùng template vẽ bằng font Hershey của OpenCV (kém chính xác hơn).
+"""
+from __future__ import annotations
+
+import os
+import string
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CHAR_W, CHAR_H = 20, 32
+DIGITS = string.digits
+LETTERS = string.ascii_uppercase
+
+PLATE_TEMPLATE_DIR = os.getenv(
+    "PLATE_TEMPLATE_DIR",
+    os.path.join(os.path.dirname(__file__), "plate_templates"),
+)
+# "auto": chỉ bật khi có thư mục template thật; "1": luôn bật; "0": tắt
+PLATE_FASTPATH = os.getenv("PLATE_FASTPATH", "auto").strip().lower()
+# ngưỡng điểm NCC của ký tự kém nhất (app đặt lại từ Config qua configure())
+PLATE_FASTPATH_MIN_CONF = float(os.getenv("PLATE_FASTPATH_MIN_CONF", 0.75))
+
+_matcher = None  # cache TemplateMatcher
+
+
+def configure(min_conf: Optional[float] = None) -> None:
+    """Đặt ngưỡng NCC (gọi trong worker OCR / tiến trình chạy inline)."""
+    global PLATE_FASTPATH_MIN_CONF
+    if min_conf is not None:
+        PLATE_FASTPATH_MIN_CONF = float(min_conf)
+
+
+def fastpath_enabled() -> bool:
+    if PLATE_FASTPATH == "auto":
+        return Path(PLATE_TEMPLATE_DIR).is_dir()
+    return PLATE_FASTPATH == "1"
+
+
+def _normalize_glyph(cv2, np, glyph):
+    """Ảnh ký tự nhị phân (chữ = 255) -> vector float32 zero-mean, norm 1."""
+    g = cv2.resize(glyph, (CHAR_W, CHAR_H), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    g -= g.mean()
+    n = float(np.linalg.norm(g))
+    return g / n if n > 0 else g
+
+
+class TemplateMatcher:
+    def __init__(self, cv2, np, template_dir: str = PLATE_TEMPLATE_DIR):
+        self.cv2, self.np = cv2, np
+        labels: List[str] = []
+        vectors = []
+
+        root = Path(template_dir)
+        if root.is_dir():
+            for sub in sorted(root.iterdir()):
+                ch = sub.name.upper()
+                if not sub.is_dir() or len(ch) != 1 or ch not in DIGITS + LETTERS:
+                    continue
+                for f in sorted(sub.iterdir()):
+                    img = cv2.imread(str(f), cv2.IMREAD_GRAYSCALE)
+                    if img is None:
+                        continue
+                    _, bw = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+                    labels.append(ch)
+                    vectors.append(_normalize_glyph(cv2, np, bw))
+
+        if not vectors:
+            labels, vectors = self._render_default_templates()
+
+        self.labels = np.array(labels)
+        self.matrix = np.stack(vectors)  # (N, CHAR_W * CHAR_H)
+        self.is_digit = np.array([c in DIGITS for c in labels])
+
+    def _render_default_templates(self):
+        cv2, np = self.cv2, self.np
+        labels, vectors = [], []
+        for ch in DIGITS + LETTERS:
+            for font in (cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX):
+                canvas = np.zeros((64, 48), dtype=np.uint8)
+                cv2.putText(canvas, ch, (4, 56), font, 2.0, 255, 5, cv2.LINE_AA)
+                ys, xs = np.nonzero(canvas)
+                glyph = canvas[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+                labels.append(ch)
+                vectors.append(_normalize_glyph(cv2, np, glyph))
+        return labels, vectors
+
+    def classify(self, glyph, allowed: str) -> Tuple[str, float]:
+        """Trả về (ký tự, điểm NCC 0..1) tốt nhất trong tập `allowed` ("digit" | "letter" | "any")."""
+        scores = self.matrix @ _normalize_glyph(self.cv2, self.np, glyph)
+        if allowed == "digit":
+            scores = self.np.where(self.is_digit, scores, -1.0)
+        elif allowed == "letter":
+            scores = self.np.where(~self.is_digit, scores, -1.0)
+        k = int(scores.argmax())
+        return str(self.labels[k]), max(0.0, float(scores[k]))
+
+
+def _ensure_matcher(cv2, np) -> TemplateMatcher:
+    global _matcher
+    if _matcher is None:
+        _matcher = TemplateMatcher(cv2, np)
+    return _matcher
+
+
+def _split_rows(np, bw) -> List:
+    """Biển vuông (2 dòng) -> tách tại hàng ít pixel chữ nhất ở khoảng giữa."""
+    h, w = bw.shape[:2]
+    if w / float(h) >= 2.5:
+        return [bw]
+    profile = (bw > 0).sum(axis=1)
+    lo, hi = int(h * 0.3), int(h * 0.7)
+    if hi <= lo:
+        return [bw]
+    cut = lo + int(np.argmin(profile[lo:hi]))
+    return [bw[:cut], bw[cut:]]
+
+
+def _segment_row(cv2, row) -> List:
+    h = row.shape[0]
+    if h == 0:
+        return []
+    n, _, stats, _ = cv2.connectedComponentsWithStats(row, connectivity=8)
+    chars = []
+    for i in range(1, n):
+        x, y, w, ch, area = stats[i]
+        if ch < h * 0.4 or ch > h * 0.98:
+            continue
+        if not (0.12 <= w / float(ch) <= 1.0) or area < 15:
+            continue
+        chars.append((x, row[y:y + ch, x:x + w]))
+    chars.sort(key=lambda c: c[0])
+    return [c[1] for c in chars]
+
+
+def _allowed_at(pos: int) -> str:
+    if pos < 2:
+        return "digit"
+    if pos == 2:
+        return "letter"
+    if pos == 3:
+        return "any"
+    return "digit"
+
+
+def read_plate_fast(cv2, np, crop_bgr) -> Tuple[Optional[str], float]:
+    """
+    Đọc biển số từ crop đã khoanh vùng. Trả về (plate, conf) hoặc (None, conf)
+    khi không đủ tin cậy (caller quay về EasyOCR).
+    """
+    from frontend.ai.plate_recognition import PLATE_PATTERNS
+
+    if crop_bgr is None or crop_bgr.size == 0:
+        return None, 0.0
+
+    gray = crop_bgr if crop_bgr.ndim == 2 else cv2.cvtColor(crop_bgr, cv2.COLOR_BGR2GRAY)
+    # biển VN: chữ tối trên nền sáng -> INV để chữ = 255
+    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    glyphs = []
+    for row in _split_rows(np, bw):
+        glyphs.extend(_segment_row(cv2, row))
+    if not 7 <= len(glyphs) <= 10:
+        return None, 0.0
+
+    matcher = _ensure_matcher(cv2, np)
+    text, scores = [], []
+    for pos, g in enumerate(glyphs):
+        ch, score = matcher.classify(g, _allowed_at(pos))
+        text.append(ch)
+        scores.append(score)
+
+    plate = "".join(text)
+    conf = min(scores)
+    if conf < PLATE_FASTPATH_MIN_CONF or not any(p.fullmatch(plate) for p in PLATE_PATTERNS):
+        return None, conf
+    return plate, conf
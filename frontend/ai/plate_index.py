@@ -0,0 +1,190 @@
+# frontend/ai/plate_index.py
+"""
+Index biển số đã biết (xe cư dân + phiên khách đang mở) để "snap" kết quả OCR gần đúng.
+
+- Mọi biển số được đưa về dạng chuẩn giống output OCR (_normalize_raw_text: bỏ ký tự lạ,
+  O->0, I->1, B->8...) => các lỗi nhầm trong _OCR_FIX_MAP có khoảng cách 0
+- Khớp chính xác dạng chuẩn trước (dict), không có mới tìm trong BK-tree theo
+  Levenshtein <= max_distance
+- Snap gần đúng (khoảng cách >= 1) chỉ khi OCR không chắc (conf < max_conf): biển VN cùng
+  series thường chỉ khác 1 ký tự, xe lạ đọc rõ không được "thành" xe cư dân.
+  (Không kiểm tra định dạng: kết quả OCR đã qua _extract_plate nên luôn đúng định dạng.)
+- Chỉ snap khi có DUY NHẤT 1 biển số ở khoảng cách nhỏ nhất (mơ hồ -> giữ nguyên)
+- Nạp lại từ DB theo TTL hoặc khi invalidate() (thêm xe, mở/đóng phiên khách)
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from frontend.ai.plate_recognition import _normalize_raw_text
+
+
+def levenshtein(a: str, b: str) -> int:
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+class BKTree:
+    """BK-tree trên chuỗi với khoảng cách Levenshtein."""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._root: Optional[Tuple[str, Dict[int, tuple]]] = None
+        self._size = 0
+        for w in words:
+            self.add(w)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, word: str) -> None:
+        if self._root is None:
+            self._root = (word, {})
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            d = levenshtein(word, node[0])
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = (word, {})
+                self._size += 1
+                return
+            node = child
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """Mọi (khoảng cách, từ) có khoảng cách <= max_distance, sắp theo khoảng cách."""
+        if self._root is None:
+            return []
+        out: List[Tuple[int, str]] = []
+        stack = [self._root]
+        while stack:
+            w, children = stack.pop()
+            d = levenshtein(word, w)
+            if d <= max_distance:
+                out.append((d, w))
+            # bất đẳng thức tam giác: chỉ con có cạnh trong [d - k, d + k] mới có thể khớp
+            for edge, child in children.items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        out.sort()
+        return out
+
+
+class PlateIndex:
+    def __init__(
+        self,
+        loader: Callable[[], Iterable[str]],
+        ttl: float = 30.0,
+        max_distance: int = 1,
+        min_length: int = 7,
+        max_conf: float = 0.6,
+    ):
+        self.loader = loader
+        self.ttl = float(ttl)
+        self.max_distance = int(max_distance)
+        self.min_length = int(min_length)
+        self.max_conf = float(max_conf)
+
+        self._by_canon: Dict[str, Set[str]] = {}
+        self._canon_set: frozenset = frozenset()
+        self._tree = BKTree()
+        self._loaded_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+        self._stats = {"exact": 0, "snapped": 0, "ambiguous": 0, "miss": 0, "kept": 0, "reloads": 0}
+
+    def invalidate(self) -> None:
+        """Đánh dấu cần nạp lại (gọi sau khi thêm xe / mở hoặc đóng phiên khách)."""
+        self._stale = True
+
+    def _reload_if_needed(self) -> None:
+        now = time.monotonic()
+        if not self._stale and now - self._loaded_at < self.ttl:
+            return
+        try:
+            plates = list(self.loader())
+        except Exception as e:
+            print("[WARN] PlateIndex reload failed:", e)
+            return
+
+        by_canon: Dict[str, Set[str]] = {}
+        for p in plates:
+            plate = "".join(ch for ch in (p or "").upper() if ch.isalnum())
+            canon = _normalize_raw_text(plate)
+            if canon:
+                by_canon.setdefault(canon, set()).add(plate)
+
+        tree = BKTree(by_canon.keys())
+        with self._lock:
+            self._by_canon, self._tree = by_canon, tree
+            self._canon_set = frozenset(by_canon)
+            self._loaded_at, self._stale = now, False
+            self._stats["reloads"] += 1
+
+    def canonical_plates(self) -> frozenset:
+        """Mọi biển số đã biết ở dạng chuẩn (_normalize_raw_text) – gửi kèm job OCR cho fast path."""
+        self._reload_if_needed()
+        with self._lock:
+            return self._canon_set
+
+    def snap(self, plate: Optional[str], conf: float = 0.0) -> Optional[str]:
+        """
+        Trả về biển số đã đăng ký gần nhất (dạng đã bỏ ký tự lạ, viết hoa) nếu khớp duy nhất,
+        ngược lại trả lại `plate` như cũ. conf: độ tin cậy OCR của `plate`; khớp gần đúng
+        chỉ áp dụng khi conf < max_conf.
+        """
+        if not plate or len(plate) < self.min_length:
+            return plate
+
+        self._reload_if_needed()
+        canon = _normalize_raw_text(plate)
+
+        with self._lock:
+            exact = self._by_canon.get(canon)
+            if exact:
+                self._stats["exact"] += 1
+                return plate if plate in exact else (next(iter(exact)) if len(exact) == 1 else plate)
+
+            if self.max_distance <= 0:
+                self._stats["miss"] += 1
+                return plate
+            if conf >= self.max_conf:
+                # đọc rõ -> có thể là xe lạ khác 1 ký tự, không snap
+                self._stats["kept"] += 1
+                return plate
+
+            hits = self._tree.search(canon, self.max_distance)
+            if not hits:
+                self._stats["miss"] += 1
+                return plate
+
+            best_d = hits[0][0]
+            best = [w for d, w in hits if d == best_d]
+            originals = self._by_canon.get(best[0], set())
+            if len(best) > 1 or len(originals) != 1:
+                self._stats["ambiguous"] += 1
+                return plate
+
+            self._stats["snapped"] += 1
+            snapped = next(iter(originals))
+            print(f"[INFO] Plate snap {plate} -> {snapped} (d={best_d})")
+            return snapped
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            data = dict(self._stats)
+            data["size"] = len(self._tree)
+        return data
@@ -1,8 +1,14 @@
 # frontend/ai/plate_recognition.py
 from __future__ import annotations
 
+import os
 import re
-from typing import Optional, List, Tuple
+import time
+from typing import Optional, List, Tuple, Dict, Any, Sequence, Collection
+
+from frontend.ai.image_utils import PLATE_MAX_SIDE, resize_to_max_side, box_to_original
+from frontend.ai.ocr_backends import PLATE_OCR_BACKEND, create_backend
+from frontend.ai.plate_fastpath import fastpath_enabled, read_plate_fast
 
 # =========================================================
 # Regex biển số VN (khá linh hoạt, đủ dùng cho demo)
@@ -27,42 +33,98 @@ _OCR_FIX_MAP = str.maketrans({
     "B": "8",
 })
 
-_reader = None  # cache EasyOCR Reader
+# Ngưỡng confidence để dừng sớm (đủ tin cậy là trả kết quả luôn)
+PLATE_MIN_CONF = 0.35
+
+# Khoanh vùng biển số trước khi OCR (chỉ OCR các vùng ứng viên thay vì cả khung hình)
+PLATE_LOCALIZE_ENABLED = os.getenv("PLATE_LOCALIZE_ENABLED", "1") == "1"
+PLATE_MAX_CANDIDATES = int(os.getenv("PLATE_MAX_CANDIDATES", 3))
+
+# OCR theo batch: gửi cùng 1 biến thể của các crop (cùng cỡ) qua model trong 1 lần gọi
+PLATE_OCR_BATCHED = os.getenv("PLATE_OCR_BATCHED", "1") == "1"
+PLATE_OCR_BATCH_SIZE = max(1, int(os.getenv("PLATE_OCR_BATCH_SIZE", 4)))
+
+# Tên các biến thể tiền xử lý, theo thứ tự mặc định
+VARIANT_NAMES: Tuple[str, ...] = ("original", "gray", "otsu", "adaptive")
+
+_reader = None  # cache OCR backend (EasyOCR Reader / ONNX), xem ocr_backends.py
+# tạo backend lỗi (thiếu model / thư viện) -> không thử lại mỗi frame, chờ hết backoff
+PLATE_READER_RETRY_SECONDS = float(os.getenv("PLATE_READER_RETRY_SECONDS", 60))
+_reader_failed_at: Optional[float] = None
+
+# Đo thời gian từng bước (chỉ bật khi chạy benchmark, xem bench_plate_ocr.py)
+_stage_times: Optional[Dict[str, List[float]]] = None
+
+
+def enable_stage_timing(enabled: bool = True) -> None:
+    """Bật/tắt ghi thời gian từng bước (decode, preprocess:<biến thể>, readtext, ...)."""
+    global _stage_times
+    _stage_times = {} if enabled else None
+
+
+def pop_stage_times() -> Dict[str, List[float]]:
+    """Lấy số liệu đã ghi (ms) từ lần pop trước và xoá để đo frame tiếp theo."""
+    global _stage_times
+    if _stage_times is None:
+        return {}
+    data, _stage_times = _stage_times, {}
+    return data
+
+
+def _record_stage(stage: str, t0: float) -> None:
+    if _stage_times is not None:
+        _stage_times.setdefault(stage, []).append((time.perf_counter() - t0) * 1000.0)
 
 
 def _lazy_import_libs():
     """
-    Import thư viện NẶNG theo kiểu lazy để app.py không bị treo lúc khởi động.
-    Trả về (easyocr, cv2, np) hoặc (None, None, None) nếu không import được.
+    Import OpenCV/Numpy theo kiểu lazy để app.py không bị treo lúc khởi động.
+    Trả về (cv2, np) hoặc (None, None) nếu không import được.
+    (Model OCR nặng được import riêng trong ocr_backends khi tạo backend.)
     """
     try:
         import cv2  # type: ignore
         import numpy as np  # type: ignore
     except Exception as e:
         print("[WARN] Không import được OpenCV/Numpy:", e)
-        return None, None, None
+        return None, None
 
-    # EasyOCR kéo torch => import chậm, chỉ làm khi thật sự OCR
-    try:
-        import easyocr  # type: ignore
-    except Exception as e:
-        print("[WARN] Không import được EasyOCR:", e)
-        return None, cv2, np
+    return cv2, np
 
-    return easyocr, cv2, np
 
-
-def _ensure_reader(easyocr):
-    """Khởi tạo EasyOCR reader 1 lần."""
-    global _reader
-    if easyocr is None:
-        return None
+def _ensure_reader(threads: Optional[int] = None):
+    """
+    Khởi tạo OCR backend (PLATE_OCR_BACKEND: easyocr | onnx) 1 lần.
+    Lỗi -> None và nhớ thời điểm lỗi: chỉ thử tạo lại sau PLATE_READER_RETRY_SECONDS.
+    """
+    global _reader, _reader_failed_at
     if _reader is None:
-        # 'en' thường đủ cho biển số dạng Latin
-        _reader = easyocr.Reader(["en"], gpu=False)
+        now = time.monotonic()
+        if _reader_failed_at is not None and now - _reader_failed_at < PLATE_READER_RETRY_SECONDS:
+            return None
+        _reader = create_backend(threads=threads)
+        _reader_failed_at = now if _reader is None else None
     return _reader
 
 
+def warmup() -> bool:
+    """
+    Load OCR backend + chạy thử 1 lần inference trên ảnh trắng,
+    để frame thật đầu tiên không phải chờ import torch / load model.
+    """
+    cv2, np = _lazy_import_libs()
+    if np is None:
+        return False
+
+    reader = _ensure_reader()
+    if reader is None:
+        return False
+
+    dummy = np.full((64, 256, 3), 255, dtype=np.uint8)
+    reader.readtext(dummy, detail=1)
+    return True
+
+
 def _normalize_raw_text(text: str) -> str:
     """
     Chuẩn hoá text OCR:
@@ -110,109 +172,421 @@ def _decode_bytes_to_bgr(cv2, np, image_bytes: bytes):
     return img
 
 
-def _preprocess_variants(cv2, img_bgr) -> List:
+def _preprocess_variants(cv2, img_bgr, order: Optional[Sequence[str]] = None) -> List[Tuple[str, object]]:
     """
-    Tạo vài biến thể ảnh để OCR dễ đọc hơn:
-    - ảnh gốc
+    Tạo vài biến thể ảnh để OCR dễ đọc hơn, trả về list (tên, ảnh):
+    - original: ảnh gốc
     - gray
-    - threshold
+    - otsu: threshold Otsu sau blur
+    - adaptive: adaptive threshold
+    `order` cho phép đổi thứ tự / bỏ bớt biến thể (biến thể bị bỏ thì không tính luôn).
     """
+    names = list(order) if order else list(VARIANT_NAMES)
+
     if cv2 is None:
-        return [img_bgr]
+        return [("original", img_bgr)]
 
-    variants = [img_bgr]
+    variants: List[Tuple[str, object]] = []
+    gray = None
     try:
-        gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-        variants.append(gray)
-
-        blur = cv2.GaussianBlur(gray, (3, 3), 0)
-        _, th1 = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        variants.append(th1)
-
-        th2 = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY, 31, 5
-        )
-        variants.append(th2)
+        for name in names:
+            t0 = time.perf_counter()
+            if name == "original":
+                variants.append((name, img_bgr))
+                _record_stage(f"preprocess:{name}", t0)
+                continue
+
+            if gray is None:
+                gray = img_bgr if len(img_bgr.shape) == 2 else cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+
+            if name == "gray":
+                variants.append((name, gray))
+            elif name == "otsu":
+                blur = cv2.GaussianBlur(gray, (3, 3), 0)
+                _, th1 = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+                variants.append((name, th1))
+            elif name == "adaptive":
+                th2 = cv2.adaptiveThreshold(
+                    gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                    cv2.THRESH_BINARY, 31, 5
+                )
+                variants.append((name, th2))
+            _record_stage(f"preprocess:{name}", t0)
     except Exception:
         pass
 
-    return variants
+    return variants or [("original", img_bgr)]
 
 
-def read_plate_from_image(image_bytes: bytes) -> Optional[str]:
+def _localize_plate_regions(cv2, img_bgr, max_candidates: int = PLATE_MAX_CANDIDATES) -> List[Tuple[int, int, int, int]]:
     """
-    Hàm app.py gọi:
-        plate_text = read_plate_from_image(img_bytes)
+    Tìm các vùng có khả năng là biển số trong ảnh BGR.
+    - lọc cạnh (Canny) + đóng hình thái để ký tự dính thành 1 khối
+    - giữ contour có tỉ lệ khung & diện tích giống biển số VN
+      (biển 1 dòng ~ 4.5:1, biển 2 dòng ~ 1.4:1)
+    Trả về list (x, y, w, h) đã nới biên, sắp theo diện tích giảm dần.
+    """
+    if cv2 is None or img_bgr is None:
+        return []
 
-    Input: bytes (ảnh PNG/JPG)
-    Output: string biển số (VD: '59AB95454') hoặc None
+    try:
+        h_img, w_img = img_bgr.shape[:2]
+        frame_area = float(h_img * w_img)
+        if frame_area <= 0:
+            return []
 
-    ✅ Lazy import: chỉ khi gọi hàm này mới import EasyOCR/torch.
-    """
-    easyocr, cv2, np = _lazy_import_libs()
+        gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+        gray = cv2.bilateralFilter(gray, 11, 17, 17)
+        edges = cv2.Canny(gray, 30, 200)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 3))
+        closed = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
 
-    if cv2 is None or np is None:
-        print("[WARN] OpenCV/Numpy chưa sẵn sàng -> không thể OCR biển số.")
-        return None
+        # OpenCV 3 trả 3 giá trị, OpenCV 4 trả 2 -> lấy phần tử [-2]
+        contours = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+    except Exception as e:
+        print("[WARN] localize plate failed:", e)
+        return []
 
-    if easyocr is None:
-        print("[WARN] EasyOCR chưa cài/không import được -> không thể OCR biển số.")
-        return None
+    boxes: List[Tuple[int, int, int, int]] = []
+    for c in sorted(contours, key=cv2.contourArea, reverse=True)[:30]:
+        x, y, w, h = cv2.boundingRect(c)
+        if w <= 0 or h <= 0:
+            continue
 
-    img = _decode_bytes_to_bgr(cv2, np, image_bytes)
-    if img is None:
-        print("[WARN] Không decode được bytes ảnh.")
-        return None
+        area = float(w * h)
+        if area < frame_area * 0.002 or area > frame_area * 0.5:
+            continue
 
-    reader = _ensure_reader(easyocr)
-    if reader is None:
-        print("[WARN] Không init được EasyOCR reader.")
-        return None
+        ratio = w / float(h)
+        if ratio < 1.0 or ratio > 6.0:
+            continue
 
-    variants = _preprocess_variants(cv2, img)
+        # contour phải "đặc" tương đối so với khung bao (loại nét chéo, dây điện...)
+        if cv2.contourArea(c) / area < 0.35:
+            continue
+
+        # nới biên ~8% để không cắt mất ký tự ở mép
+        pad_x, pad_y = int(w * 0.08), int(h * 0.08)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1, y1 = min(w_img, x + w + pad_x), min(h_img, y + h + pad_y)
+        box = (x0, y0, x1 - x0, y1 - y0)
+
+        if any(_box_iou(box, b) > 0.5 for b in boxes):
+            continue
+
+        boxes.append(box)
+        if len(boxes) >= max_candidates:
+            break
+
+    return boxes
+
+
+def _box_iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / float(union) if union > 0 else 0.0
+
+
+def _crop_box(cv2, img_bgr, box: Tuple[int, int, int, int]):
+    """Cắt vùng biển số; phóng to crop quá nhỏ để EasyOCR đọc ổn hơn."""
+    x, y, w, h = box
+    crop = img_bgr[y:y + h, x:x + w]
+    if cv2 is not None and 0 < h < 64:
+        scale = 64.0 / h
+        crop = cv2.resize(crop, (int(w * scale), 64), interpolation=cv2.INTER_CUBIC)
+    return crop
+
+
+def _image_shape(im) -> Tuple[int, int]:
+    return tuple(im.shape[:2]) if hasattr(im, "shape") else (0, 0)
+
+
+def _iter_batches(jobs: List[Tuple[int, str, object]], batch_size: int):
+    """
+    Gom các job (img_idx, tên biến thể, ảnh) LIÊN TIẾP, CÙNG biến thể và CÙNG kích thước
+    thành 1 batch: 1 batch = 1 biến thể trên nhiều crop, nên dừng sớm sau biến thể đầu
+    vẫn như khi chạy tuần tự. Không resize để gộp ảnh khác cỡ (tránh méo ký tự).
+    """
+    batch: List[Tuple[int, str, object]] = []
+    for job in jobs:
+        if batch and (
+            len(batch) >= batch_size
+            or job[1] != batch[0][1]
+            or _image_shape(job[2]) != _image_shape(batch[0][2])
+        ):
+            yield batch
+            batch = []
+        batch.append(job)
+    if batch:
+        yield batch
+
+
+def _readtext_batch(reader, ims: List, label: str) -> Tuple[List[Optional[list]], List[float]]:
+    """
+    OCR 1 batch ảnh. Trả về (kết quả, thời gian ms) song song với `ims`
+    (kết quả None nếu ảnh đó lỗi).
+    - Batched: 1 lần gọi readtext_batched -> trả overhead model 1 lần cho cả batch
+      (thời gian chia đều cho các ảnh trong batch)
+    - Không hỗ trợ / lỗi -> quay về readtext từng ảnh như cũ
+    """
+    if PLATE_OCR_BATCHED and len(ims) > 1 and hasattr(reader, "readtext_batched"):
+        t0 = time.perf_counter()
+        try:
+            results = list(reader.readtext_batched(ims, detail=1, batch_size=len(ims)))
+            _record_stage("readtext", t0)
+            ms = (time.perf_counter() - t0) * 1000.0 / len(ims)
+            return results, [ms] * len(ims)
+        except Exception as e:
+            print(f"[WARN] OCR batched error {label}, fallback tuần tự:", e)
+
+    out: List[Optional[list]] = []
+    times: List[float] = []
+    for idx, im in enumerate(ims):
+        t0 = time.perf_counter()
+        try:
+            out.append(reader.readtext(im, detail=1))
+        except Exception as e:
+            print(f"[WARN] OCR error {label} item#{idx}:", e)
+            out.append(None)
+        _record_stage("readtext", t0)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    return out, times
+
+
+def _ocr_images(
+    reader,
+    cv2,
+    images: List,
+    label: str,
+    order: Optional[Sequence[str]] = None,
+    detail: Optional[Dict[str, Any]] = None,
+    explore: bool = False,
+) -> Tuple[float, Optional[str]]:
+    """
+    OCR các ảnh (crop hoặc cả khung), mỗi ảnh thử các biến thể theo `order`.
+    - Tuần tự: ảnh 1 mọi biến thể, rồi ảnh 2...; dừng sớm khi có biển số đạt PLATE_MIN_CONF
+    - Batched: biến thể 1 trên mọi ảnh (1 lần gọi nếu cùng cỡ), rồi biến thể 2...;
+      dừng sớm sau mỗi biến thể => frame dễ vẫn chỉ trả cho biến thể đầu tiên
+    - explore=True (frame thăm dò của telemetry): chạy đủ mọi biến thể, không dừng sớm,
+      "winner" là biến thể cho conf cao nhất => so sánh công bằng giữa các biến thể
+    Nếu truyền `detail` (dict) thì ghi thêm số lần chạy / thời gian của từng biến thể
+    và biến thể cho ra kết quả tốt nhất ("winner").
+    Trả về (conf, plate) tốt nhất.
+    """
+    per_image = [_preprocess_variants(cv2, img, order) for img in images]
+    jobs: List[Tuple[int, str, object]] = []
+    if PLATE_OCR_BATCHED:
+        for vi in range(max((len(v) for v in per_image), default=0)):
+            for img_idx, variants in enumerate(per_image):
+                if vi < len(variants):
+                    jobs.append((img_idx, variants[vi][0], variants[vi][1]))
+    else:
+        for img_idx, variants in enumerate(per_image):
+            for name, im in variants:
+                jobs.append((img_idx, name, im))
+
+    batch_size = PLATE_OCR_BATCH_SIZE if PLATE_OCR_BATCHED else 1
+    stats = detail.setdefault("variants", {}) if detail is not None else {}
 
     # Dùng detail=1 để có confidence; ưu tiên chuỗi có conf cao
     best: Tuple[float, Optional[str]] = (0.0, None)
-
-    for idx, im in enumerate(variants):
+    winner: Optional[str] = None
+
+    def _done():
+        if detail is not None and best[1]:
+            detail["winner"] = winner
+        return best
+
+    for batch in _iter_batches(jobs, batch_size):
+        results_list, times = _readtext_batch(reader, [j[2] for j in batch], label)
+
+        for (img_idx, name, _), results, ms in zip(batch, results_list, times):
+            st = stats.setdefault(name, {"runs": 0, "ms": 0.0})
+            st["runs"] += 1
+            st["ms"] += ms
+
+            if results is None:
+                continue
+
+            raw_texts = []
+            for item in results:
+                if len(item) >= 3:
+                    text = item[1] or ""
+                    conf = float(item[2] or 0.0)
+                else:
+                    text = str(item)
+                    conf = 0.0
+
+                raw_texts.append(text)
+
+                t0 = time.perf_counter()
+                norm = _normalize_raw_text(text)
+                plate = _extract_plate(norm)
+                _record_stage("extract_plate", t0)
+                if plate and conf > best[0]:
+                    best = (conf, plate)
+                    winner = name
+
+            print(f"[DEBUG OCR {label}#{img_idx} {name}] raw_texts =", raw_texts)
+
+            if not explore and best[1] and best[0] >= PLATE_MIN_CONF:
+                return _done()
+
+            # fallback: ghép tất cả text lại rồi thử extract
+            t0 = time.perf_counter()
+            joined = _normalize_raw_text("".join(raw_texts))
+            plate2 = _extract_plate(joined)
+            _record_stage("extract_plate", t0)
+            if plate2 and best[1] is None:
+                best = (max(best[0], 0.2), plate2)
+                winner = name
+
+    return _done()
+
+
+def _read_plate_fastpath(cv2, np, crops, detail: Optional[Dict[str, Any]]) -> Tuple[Optional[str], float]:
+    """Thử plate_fastpath trên từng crop; ghi telemetry như 1 biến thể tên "fastpath"."""
+    t0 = time.perf_counter()
+    plate, conf = None, 0.0
+    for crop in crops:
         try:
-            results = reader.readtext(im, detail=1)
+            plate, conf = read_plate_fast(cv2, np, crop)
         except Exception as e:
-            print(f"[WARN] OCR error variant#{idx}:", e)
-            continue
+            print("[WARN] Fastpath lỗi, chuyển sang OCR:", e)
+            plate, conf = None, 0.0
+            break
+        if plate:
+            break
+    ms = (time.perf_counter() - t0) * 1000.0
+    _record_stage("fastpath", t0)
+
+    if detail is not None:
+        detail["variants"]["fastpath"] = {"runs": 1, "ms": ms}
+        if plate:
+            detail["winner"] = "fastpath"
+    return plate, conf
+
+
+def read_plate_detailed(
+    image_bytes: bytes,
+    variant_order: Optional[Sequence[str]] = None,
+    explore: bool = False,
+    fastpath_plates: Optional[Collection[str]] = None,
+) -> Dict[str, Any]:
+    """
+    OCR biển số kèm telemetry:
+        {"plate": str | None, "conf": float, "winner": tên biến thể | None,
+         "variants": {tên: {"runs": n, "ms": tổng ms}}}
+    `variant_order`: thứ tự biến thể cần thử (None = VARIANT_NAMES).
+    winner = "fastpath" -> conf là điểm NCC của plate_fastpath, không phải xác suất OCR.
+    explore=True: frame thăm dò – bỏ fast path, chạy đủ mọi biến thể (xem _ocr_images).
+    fastpath_plates: tập biển số (dạng _normalize_raw_text) được phép nhận từ fast path;
+    fast path đọc ra biển ngoài tập -> OCR đầy đủ ngay trong lần gọi này
+    ("fastpath_rejected": True). None = nhận mọi kết quả fast path (benchmark).
+    """
+    detail: Dict[str, Any] = {
+        "plate": None, "conf": 0.0, "winner": None, "variants": {},
+        "explore": explore, "fastpath_rejected": False,
+    }
+    plate, conf = _read_plate_impl(image_bytes, variant_order, detail, not explore, explore, fastpath_plates)
+    detail["plate"], detail["conf"] = plate, conf
+    return detail
 
-        raw_texts = []
-        for item in results:
-            if len(item) >= 3:
-                text = item[1] or ""
-                conf = float(item[2] or 0.0)
-            else:
-                text = str(item)
-                conf = 0.0
 
-            raw_texts.append(text)
+def read_plate_with_confidence(image_bytes: bytes) -> Tuple[Optional[str], float]:
+    """
+    Như read_plate_from_image nhưng trả thêm confidence: (plate | None, conf).
+    Dùng cho bỏ phiếu nhiều frame (plate_voting).
+    """
+    return _read_plate_impl(image_bytes, None, None)
 
-            norm = _normalize_raw_text(text)
-            plate = _extract_plate(norm)
-            if plate and conf > best[0]:
-                best = (conf, plate)
 
-        print(f"[DEBUG OCR variant#{idx}] raw_texts =", raw_texts)
+def _read_plate_impl(
+    image_bytes: bytes,
+    variant_order: Optional[Sequence[str]],
+    detail: Optional[Dict[str, Any]],
+    allow_fastpath: bool = True,
+    explore: bool = False,
+    fastpath_plates: Optional[Collection[str]] = None,
+) -> Tuple[Optional[str], float]:
+    cv2, np = _lazy_import_libs()
+
+    if cv2 is None or np is None:
+        print("[WARN] OpenCV/Numpy chưa sẵn sàng -> không thể OCR biển số.")
+        return None, 0.0
+
+    t0 = time.perf_counter()
+    img = _decode_bytes_to_bgr(cv2, np, image_bytes)
+    _record_stage("decode", t0)
+    if img is None:
+        print("[WARN] Không decode được bytes ảnh.")
+        return None, 0.0
+
+    # ảnh làm việc đã giới hạn độ phân giải: khoanh vùng + OCR cả khung chạy trên ảnh này,
+    # còn crop biển số thì map box về ảnh gốc để giữ chi tiết ký tự
+    t0 = time.perf_counter()
+    work, scale = resize_to_max_side(img, PLATE_MAX_SIDE)
+    _record_stage("resize", t0)
+
+    crops = []
+    if PLATE_LOCALIZE_ENABLED:
+        t0 = time.perf_counter()
+        boxes = _localize_plate_regions(cv2, work)
+        _record_stage("localize", t0)
+        crops = [_crop_box(cv2, img, box_to_original(b, scale, img.shape)) for b in boxes]
+
+    # fast path: tách ký tự + so template trên crop, đủ tin cậy thì khỏi gọi EasyOCR
+    if crops and allow_fastpath and fastpath_enabled():
+        fast = _read_plate_fastpath(cv2, np, crops, detail)
+        if fast[0] and (fastpath_plates is None or _normalize_raw_text(fast[0]) in fastpath_plates):
+            print("[INFO] Plate found (fastpath):", fast[0], "conf=", fast[1])
+            return fast
+        if fast[0]:
+            # thang NCC chưa hiệu chỉnh -> biển lạ phải qua OCR đầy đủ
+            print("[INFO] Fastpath", fast[0], "không phải biển đã biết -> OCR đầy đủ")
+            if detail is not None:
+                detail["winner"] = None
+                detail["fastpath_rejected"] = True
+
+    reader = _ensure_reader()
+    if reader is None:
+        print(f"[WARN] Không init được OCR backend ({PLATE_OCR_BACKEND}) -> không thể OCR biển số.")
+        return None, 0.0
+
+    best: Tuple[float, Optional[str]] = (0.0, None)
+    if crops:
+        best = _ocr_images(reader, cv2, crops, "crop", variant_order, detail, explore)
 
-        if best[1] and best[0] >= 0.35:
-            print("[INFO] Plate found (early):", best[1], "conf=", best[0])
-            return best[1]
+    # fallback: không khoanh được vùng nào / crop không ra biển số -> OCR cả khung
+    if best[1] is None:
+        best = _ocr_images(reader, cv2, [work], "frame", variant_order, detail, explore)
 
-        # fallback: ghép tất cả text lại rồi thử extract
-        joined = _normalize_raw_text("".join(raw_texts))
-        plate2 = _extract_plate(joined)
-        if plate2 and best[1] is None:
-            best = (max(best[0], 0.2), plate2)
+    if best[1] and best[0] >= PLATE_MIN_CONF:
+        print("[INFO] Plate found (early):", best[1], "conf=", best[0])
+        return best[1], best[0]
 
     if best[1]:
         print("[INFO] Plate found:", best[1], "conf=", best[0])
-        return best[1]
+        return best[1], best[0]
 
     print("[INFO] No valid plate found from OCR after normalization.")
-    return None
+    return None, 0.0
+
+
+def read_plate_from_image(image_bytes: bytes) -> Optional[str]:
+    """
+    Hàm app.py gọi:
+        plate_text = read_plate_from_image(img_bytes)
+
+    Input: bytes (ảnh PNG/JPG)
+    Output: string biển số (VD: '59AB95454') hoặc None
+
+    ✅ Lazy import: chỉ khi gọi hàm này mới import EasyOCR/torch (hoặc onnxruntime).
+    ✅ Khoanh vùng biển số trước, chỉ OCR các crop; không thấy gì mới OCR cả khung.
+    """
+    plate, _ = read_plate_with_confidence(image_bytes)
+    return plate
@@ -0,0 +1,126 @@
+# frontend/ai/plate_voting.py
+"""
+Bỏ phiếu biển số qua nhiều frame liên tiếp cho từng kiosk (làn cổng).
+
+Thay vì chốt ngay 1 frame có conf >= 0.35, mỗi kiosk có 1 "cửa sổ" cộng dồn
+confidence theo từng biển số đọc được:
+- 1 frame rất chắc (>= strong_conf) -> chốt luôn
+- hoặc tổng điểm của biển số dẫn đầu >= commit_score và gấp `margin` lần biển số thứ 2
+Cửa sổ tự reset khi kiosk im lặng quá `window_seconds` hoặc sau khi đã chốt.
+
+- Mỗi frame chỉ được bỏ phiếu 1 lần trong cửa sổ (frame_key = hash bytes ảnh): camera
+  đứng hình gửi lại đúng frame cũ (PlateResultCache trả kết quả cũ) không tự cộng đủ điểm
+- leader(kiosk_id): biển số đang dẫn đầu -> cho fast path xác nhận lại bằng chứng cũ
+  thay vì OCR đầy đủ từ đầu
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple
+
+
+class PlateVoter:
+    def __init__(
+        self,
+        window_seconds: float = 6.0,
+        commit_score: float = 1.0,
+        strong_conf: float = 0.8,
+        margin: float = 2.0,
+        max_kiosks: int = 64,
+    ):
+        self.window_seconds = float(window_seconds)
+        self.commit_score = float(commit_score)
+        self.strong_conf = float(strong_conf)
+        self.margin = float(margin)
+        self.max_kiosks = int(max_kiosks)
+
+        # kiosk_id -> {"last": ts, "frames": n, "votes": {plate: [sum_conf, count]}, "seen": {frame_key}}
+        self._windows: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get_window(self, kiosk_id: str, now: float) -> Dict[str, Any]:
+        win = self._windows.get(kiosk_id)
+        if win is None or now - win["last"] > self.window_seconds:
+            if win is None and len(self._windows) >= self.max_kiosks:
+                # bỏ kiosk lâu nhất không gửi frame
+                oldest = min(self._windows, key=lambda k: self._windows[k]["last"])
+                del self._windows[oldest]
+            win = {"last": now, "frames": 0, "votes": {}, "seen": set()}
+            self._windows[kiosk_id] = win
+        return win
+
+    @staticmethod
+    def _ranked(win: Dict[str, Any]):
+        return sorted(win["votes"].items(), key=lambda kv: kv[1][0], reverse=True)
+
+    def leader(self, kiosk_id: str) -> Optional[str]:
+        """Biển số đang dẫn đầu cửa sổ còn hiệu lực của kiosk (None nếu chưa có)."""
+        now = time.monotonic()
+        with self._lock:
+            win = self._windows.get(kiosk_id)
+            if win is None or now - win["last"] > self.window_seconds or not win["votes"]:
+                return None
+            return self._ranked(win)[0][0]
+
+    def add(
+        self,
+        kiosk_id: str,
+        plate: Optional[str],
+        conf: float,
+        frame_key: Optional[str] = None,
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Thêm kết quả OCR của 1 frame.
+        frame_key: định danh nội dung frame (vd. SHA-1 bytes ảnh); frame đã bỏ phiếu trong
+        cửa sổ này thì không tính thêm (info["duplicate"] = True).
+        Trả về (plate_đã_chốt | None, thông tin cửa sổ hiện tại).
+        """
+        now = time.monotonic()
+        with self._lock:
+            win = self._get_window(kiosk_id, now)
+            win["last"] = now
+
+            duplicate = frame_key is not None and frame_key in win["seen"]
+            if duplicate:
+                ranked = self._ranked(win)
+                return None, {
+                    "frames": win["frames"],
+                    "leader": ranked[0][0] if ranked else None,
+                    "score": round(ranked[0][1][0], 3) if ranked else 0.0,
+                    "duplicate": True,
+                }
+            if frame_key is not None:
+                win["seen"].add(frame_key)
+            win["frames"] += 1
+
+            if plate:
+                v = win["votes"].setdefault(plate, [0.0, 0])
+                v[0] += float(conf)
+                v[1] += 1
+
+            ranked = self._ranked(win)
+            info = {
+                "frames": win["frames"],
+                "leader": ranked[0][0] if ranked else None,
+                "score": round(ranked[0][1][0], 3) if ranked else 0.0,
+                "duplicate": False,
+            }
+
+            decided = None
+            if plate and conf >= self.strong_conf:
+                decided = plate
+            elif ranked:
+                top_score = ranked[0][1][0]
+                runner_up = ranked[1][1][0] if len(ranked) > 1 else 0.0
+                if top_score >= self.commit_score and top_score >= self.margin * runner_up:
+                    decided = ranked[0][0]
+
+            if decided:
+                del self._windows[kiosk_id]
+
+            return decided, info
+
+    def reset(self, kiosk_id: str) -> None:
+        with self._lock:
+            self._windows.pop(kiosk_id, None)
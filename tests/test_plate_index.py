@@ -0,0 +1,31 @@
+from frontend.ai.plate_index import PlateIndex
+from frontend.ai.plate_recognition import _extract_plate, _normalize_raw_text
+
+
+def _read(raw: str) -> str:
+    """Giống đường OCR thật: chuẩn hoá text EasyOCR rồi trích biển số đúng định dạng."""
+    return _extract_plate(_normalize_raw_text(raw))
+
+
+def test_snap_low_conf_extracted_read_to_registered_plate():
+    index = PlateIndex(lambda: ["51F12345", "30E99999"])
+    plate = _read("51F-123.46")
+    assert plate == "51F12346"
+
+    assert index.snap(plate, conf=0.4) == "51F12345"
+    assert index.stats()["snapped"] == 1
+
+
+def test_keep_high_conf_read_of_unregistered_plate():
+    index = PlateIndex(lambda: ["51F12345"])
+    plate = _read("51F-123.46")
+
+    assert index.snap(plate, conf=0.9) == plate
+    assert index.stats()["snapped"] == 0
+
+
+def test_refuse_snap_when_two_plates_equally_close():
+    index = PlateIndex(lambda: ["51F12345", "51F12347"])
+
+    assert index.snap(_read("51F12346"), conf=0.4) == "51F12346"
+    assert index.stats()["ambiguous"] == 1
@@ -0,0 +1,19 @@
+from frontend.ai.plate_voting import PlateVoter
+
+
+def test_duplicate_frame_does_not_vote_twice():
+    voter = PlateVoter(commit_score=1.0, strong_conf=0.8)
+
+    assert voter.add("k1", "51F12345", 0.6, frame_key="a")[0] is None
+    decided, info = voter.add("k1", "51F12345", 0.6, frame_key="a")
+    assert decided is None
+    assert info["duplicate"] and info["frames"] == 1 and info["score"] == 0.6
+
+
+def test_distinct_frames_commit_and_leader():
+    voter = PlateVoter(commit_score=1.0, strong_conf=0.8)
+
+    assert voter.add("k1", "51F12345", 0.6, frame_key="a")[0] is None
+    assert voter.leader("k1") == "51F12345"
+    assert voter.add("k1", "51F12345", 0.6, frame_key="b")[0] == "51F12345"
+    assert voter.leader("k1") is None